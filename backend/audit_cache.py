@@ -0,0 +1,93 @@
+"""
+Per-article LLM audit cache.
+
+Stores each article's audit (detected topic, verdict, support score) under
+(claim hash, normalized URL) together with the hash of the excerpt that was
+audited. Re-analysing an agenda only sends articles that are new or whose
+excerpt changed to the LLM; everything else is reused from here.
+"""
+from typing import Dict, List
+
+from psycopg2.extras import execute_values
+
+import database as db
+from cache import normalize_url
+from excerpt_cache import content_hash
+
+
+def claim_hash(claim: str) -> str:
+    return content_hash(claim.strip().lower())
+
+
+def get_cached_audits(claim: str, evidence: list) -> Dict[str, dict]:
+    """
+    Return cached audits for `evidence`, keyed by evidence id, in the raw
+    LLM audit shape (id, detected_topic, verdict, support_score). Only audits
+    of the exact same excerpt are returned.
+    """
+    if not evidence:
+        return {}
+    # The same URL can appear more than once in an agenda; every copy gets the audit
+    wanted: Dict[str, List[tuple]] = {}
+    for e in evidence:
+        if e.get("url"):
+            wanted.setdefault(normalize_url(e["url"]), []).append((e["id"], content_hash(e.get("excerpt") or "")))
+    try:
+        with db.read() as cursor:
+            cursor.execute(
+                """SELECT url_key, excerpt_hash, topic, verdict, score
+                   FROM article_audits
+                   WHERE claim_hash = %s AND url_key = ANY(%s)""",
+                (claim_hash(claim), list(wanted))
+            )
+            audits = {}
+            for url_key, excerpt_hash, topic, verdict, score in cursor.fetchall():
+                for evidence_id, current_hash in wanted[url_key]:
+                    if excerpt_hash == current_hash:
+                        audits[evidence_id] = {
+                            "id": evidence_id,
+                            "detected_topic": topic,
+                            "verdict": verdict,
+                            "support_score": score,
+                        }
+            return audits
+    except Exception as e:
+        print(f"Audit cache read failed: {e}")
+        return {}
+
+
+def store_audits(claim: str, evidence: list, article_scores: List[dict]) -> None:
+    """Persist freshly produced per-article scores (postprocess_llm_result shape)."""
+    by_id = {e["id"]: e for e in evidence if e.get("url")}
+    rows = {}
+    for a in article_scores or []:
+        item = by_id.get(a.get("id"))
+        if item is None:
+            continue
+        url_key = normalize_url(item["url"])
+        rows[url_key] = (
+            claim_hash(claim),
+            url_key,
+            content_hash(item.get("excerpt") or ""),
+            a.get("topic", ""),
+            a.get("verdict", "Unknown"),
+            a["score"],
+        )
+    if not rows:
+        return
+    try:
+        with db.transaction() as cursor:
+            execute_values(
+                cursor,
+                """INSERT INTO article_audits (claim_hash, url_key, excerpt_hash, topic, verdict, score)
+                   VALUES %s
+                   ON CONFLICT (claim_hash, url_key) DO UPDATE SET
+                       excerpt_hash = EXCLUDED.excerpt_hash,
+                       topic = EXCLUDED.topic,
+                       verdict = EXCLUDED.verdict,
+                       score = EXCLUDED.score,
+                       audited_at = CURRENT_TIMESTAMP""",
+                list(rows.values())
+            )
+    except Exception as e:
+        print(f"Audit cache write failed: {e}")
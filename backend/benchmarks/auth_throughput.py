@@ -0,0 +1,57 @@
+"""
+Throughput benchmark for authenticated reads.
+
+Hammers an authenticated endpoint (GET /auth/me by default) for a fixed time
+and reports requests/sec. Run it against a server started with
+USER_CACHE_TTL=0 (every request hits the users table) and again with the
+default cache, or with AUTH_EMBED_USER_CLAIMS=true, to compare.
+
+Usage:
+    USER_CACHE_TTL=0 uvicorn main:app --port 8000 &
+    python benchmarks/auth_throughput.py --email bench@example.com --password secret
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from load_agendas import get_token, percentile
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=30) as client:
+        headers = {"Authorization": f"Bearer {await get_token(client, args.email, args.password)}"}
+        latencies = []
+        errors = 0
+        deadline = time.perf_counter() + args.duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.get(args.path, headers=headers)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(
+        f"{args.path}: {len(latencies) / elapsed:8.1f} req/s over {elapsed:.1f}s "
+        f"(n={len(latencies)}, errors={errors}, p50={percentile(latencies, 50):.1f}ms, "
+        f"p99={percentile(latencies, 99):.1f}ms)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--path", default="/auth/me")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds to run")
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
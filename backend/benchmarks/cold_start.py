@@ -0,0 +1,78 @@
+"""
+Cold start to first response: how long a fresh API process takes to answer.
+
+Starts `uvicorn main:app` in a new process --runs times, polls --path until it
+returns a response (any status below 500) and reports the time from spawn to
+that first response: interpreter start, imports, the startup hook, then the
+request itself. Extra environment for the server goes in --env, e.g. to
+compare in-process DB init with running migrations as a separate step:
+
+Usage:
+    python benchmarks/cold_start.py --env DB_INIT_ON_STARTUP=false
+    python benchmarks/cold_start.py --env DB_INIT_ON_STARTUP=true --path /health/db
+"""
+import argparse
+import os
+import pathlib
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+BACKEND = pathlib.Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def cold_start(path: str, env: dict, timeout: float, show_output: bool) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND,
+        env={**os.environ, **env},
+        stdout=None if show_output else subprocess.DEVNULL,
+        stderr=None if show_output else subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}{path}"
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                sys.exit(f"Server exited with code {server.returncode} before answering (rerun with --verbose)")
+            try:
+                # A fresh connection per attempt, so nothing is reused across runs
+                if requests.get(url, timeout=1).status_code < 500:
+                    return (time.perf_counter() - started) * 1000
+            except requests.ConnectionError:
+                pass
+            time.sleep(0.01)
+        sys.exit(f"No response from {url} within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(args):
+    env = dict(item.split("=", 1) for item in args.env)
+    timings = [cold_start(args.path, env, args.timeout, args.verbose) for _ in range(args.runs)]
+    label = " ".join(args.env) or "default environment"
+    print(f"GET {args.path} ({label}), {args.runs} cold starts")
+    print(f"first response: median={statistics.median(timings):.0f}ms "
+          f"min={min(timings):.0f}ms max={max(timings):.0f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--verbose", action="store_true", help="show the server's output")
+    main(parser.parse_args())
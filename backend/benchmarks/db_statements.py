@@ -0,0 +1,136 @@
+"""
+Statements per request: the old get_db_connection()/close() pattern vs. db.read()/db.transaction().
+
+Runs a typical read (one SELECT) and a typical write (one INSERT) --repeat
+times each way against the configured database and counts what actually
+goes over the wire: the implicit BEGIN psycopg2 sends before the first
+statement of a transaction, the statements themselves, COMMIT and ROLLBACK.
+The old pattern always rolled back on close(), even after a commit or a
+read-only request; read() runs in autocommit and transaction() only rolls
+back on error. A third read runs the same SELECT through the query registry
+as a prepared statement, which saves server-side parse/plan time rather
+than round trips.
+
+Usage:
+    python benchmarks/db_statements.py --repeat 200
+"""
+import argparse
+import pathlib
+import statistics
+import sys
+import time
+from collections import Counter
+
+import psycopg2.extensions
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+import database as db  # noqa: E402
+import queries  # noqa: E402
+
+counts = Counter()
+
+
+class _CountingCursor(psycopg2.extensions.cursor):
+    def execute(self, query, vars=None):
+        if not self.connection.autocommit and self.connection.info.transaction_status == TRANSACTION_STATUS_IDLE:
+            counts["BEGIN"] += 1
+        counts["statement"] += 1
+        return super().execute(query, vars)
+
+
+class _CountingConnection(db.Connection):
+    def cursor(self, *args, **kwargs):
+        kwargs.setdefault("cursor_factory", _CountingCursor)
+        return super().cursor(*args, **kwargs)
+
+    def commit(self):
+        if self.info.transaction_status != TRANSACTION_STATUS_IDLE:
+            counts["COMMIT"] += 1
+        return super().commit()
+
+    def rollback(self):
+        # psycopg2 sends ROLLBACK whenever asked, even with no open transaction
+        counts["ROLLBACK"] += 1
+        return super().rollback()
+
+
+def legacy_read():
+    conn = db.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT count(*) FROM bench_statements")
+        cursor.fetchone()
+    finally:
+        conn.rollback()  # what PooledConnection.close() used to do unconditionally
+        conn.close()
+
+
+def legacy_write():
+    conn = db.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO bench_statements (note) VALUES (%s)", ("legacy",))
+        conn.commit()
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def context_read():
+    with db.read() as cursor:
+        cursor.execute("SELECT count(*) FROM bench_statements")
+        cursor.fetchone()
+
+
+_COUNT = queries.register("bench_statements_count", "SELECT count(*) FROM bench_statements")
+
+
+def prepared_read():
+    with db.read() as cursor:
+        queries.run(cursor, _COUNT)
+        cursor.fetchone()
+
+
+def context_write():
+    with db.transaction() as cursor:
+        cursor.execute("INSERT INTO bench_statements (note) VALUES (%s)", ("context",))
+
+
+def run(label, func, repeat):
+    counts.clear()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    per_request = {k: v / repeat for k, v in sorted(counts.items())}
+    total = sum(per_request.values())
+    detail = " ".join(f"{k}={v:.2f}" for k, v in per_request.items())
+    print(f"{label:<22} {total:5.2f} round trips/request ({detail})  median={statistics.median(timings):.2f}ms")
+    return total
+
+
+def main(args):
+    db.Connection = _CountingConnection
+    with db.transaction() as cursor:
+        cursor.execute("CREATE TABLE IF NOT EXISTS bench_statements (id SERIAL PRIMARY KEY, note TEXT)")
+    try:
+        before = run("read  (old pattern)", legacy_read, args.repeat)
+        after = run("read  (db.read)", context_read, args.repeat)
+        print(f"  -> {before - after:.2f} fewer round trips per read")
+        run("read  (prepared)", prepared_read, args.repeat)
+        before = run("write (old pattern)", legacy_write, args.repeat)
+        after = run("write (db.transaction)", context_write, args.repeat)
+        print(f"  -> {before - after:.2f} fewer round trips per write")
+        print(f"pool: {db.pool_stats()}")
+    finally:
+        with db.transaction() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS bench_statements")
+        db.close_db_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    main(parser.parse_args())
@@ -0,0 +1,86 @@
+"""
+Connection reuse benchmark: one-off requests.get() vs. the shared pooled session.
+
+Fetches each URL --repeat times both ways and prints mean/median latency.
+The difference is mostly DNS + TCP + TLS setup, which the pooled session
+pays once per host instead of on every call. With --local a keep-alive
+HTTP server is started on loopback so the script runs without network
+access (setup cost is then TCP only, so expect a smaller gap).
+
+Usage:
+    python benchmarks/http_reuse.py https://www.bbc.com/news https://www.ynet.co.il
+    python benchmarks/http_reuse.py --local
+"""
+import argparse
+import pathlib
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+from http_client import get_session  # noqa: E402
+from scraper import BROWSER_HEADERS  # noqa: E402
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    body = b"<html><head><title>bench</title></head><body>" + b"x" * 20000 + b"</body></html>"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_local_server() -> str:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def time_fetches(get, url, repeat, timeout):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = get(url, headers=BROWSER_HEADERS, timeout=timeout)
+        response.content
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main(args):
+    urls = list(args.urls)
+    if args.local:
+        urls.append(start_local_server())
+    if not urls:
+        sys.exit("Pass one or more URLs or --local")
+
+    session = get_session()
+    for url in urls:
+        print(url)
+        # Warm the pool once so the session numbers reflect steady state
+        session.get(url, headers=BROWSER_HEADERS, timeout=args.timeout).content
+        fresh = time_fetches(requests.get, url, args.repeat, args.timeout)
+        pooled = time_fetches(session.get, url, args.repeat, args.timeout)
+        for label, timings in (("requests.get", fresh), ("pooled session", pooled)):
+            print(f"  {label:<16} mean={statistics.mean(timings):8.2f}ms median={statistics.median(timings):8.2f}ms")
+        print(f"  saved per call: {statistics.mean(fresh) - statistics.mean(pooled):.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("urls", nargs="*")
+    parser.add_argument("--local", action="store_true", help="also benchmark a loopback keep-alive server")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=10)
+    main(parser.parse_args())
@@ -0,0 +1,73 @@
+"""
+Per-module import cost of the API at startup.
+
+Imports --module (default: main) in a fresh interpreter under
+`python -X importtime`, several times, and reports the median run:
+self time summed per top-level package (where the time actually goes) and
+the slowest modules by cumulative time (what pulled it in). Run it before
+and after moving an import behind first use to see what a cold start saves.
+
+Usage:
+    python benchmarks/import_profile.py
+    python benchmarks/import_profile.py --module routers.agendas --top 30
+"""
+import argparse
+import pathlib
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+BACKEND = pathlib.Path(__file__).resolve().parent.parent
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def profile_once(module: str):
+    """Return [(name, depth, self_us, cumulative_us)] for one cold import."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((m.group(4), len(m.group(3)) // 2, int(m.group(1)), int(m.group(2))))
+    return rows
+
+
+def main(args):
+    runs = [profile_once(args.module) for _ in range(args.repeat)]
+    totals = [sum(r[2] for r in rows) for rows in runs]
+    rows = runs[totals.index(sorted(totals)[len(totals) // 2])]
+    total_ms = sum(r[2] for r in rows) / 1000
+    print(f"import {args.module}: {total_ms:.0f}ms total, {len(rows)} modules "
+          f"(median of {args.repeat}, runs ranged {min(totals) / 1000:.0f}-{max(totals) / 1000:.0f}ms)\n")
+
+    by_package = defaultdict(int)
+    for name, _, self_us, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+    print(f"{'package':<32} {'self ms':>8} {'share':>6}")
+    for package, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{package:<32} {us / 1000:8.1f} {us / 1000 / total_ms:6.1%}")
+
+    print(f"\n{'module (cumulative)':<48} {'cum ms':>8} {'self ms':>8}")
+    for name, depth, self_us, cum_us in sorted(rows, key=lambda r: -r[3])[:args.top]:
+        if depth <= args.depth:
+            print(f"{'  ' * depth + name:<48} {cum_us / 1000:8.1f} {self_us / 1000:8.1f}")
+
+    if args.verbose:
+        print(f"\nstdev of totals: {statistics.pstdev(totals) / 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=3, help="hide modules nested deeper than this in the cumulative list")
+    parser.add_argument("--verbose", action="store_true")
+    main(parser.parse_args())
@@ -0,0 +1,92 @@
+"""
+Load test: GET /agendas latency while analyses run concurrently.
+
+Measures GET /agendas latency percentiles twice against a running server:
+once idle, and once while `--analyses` concurrent POST /agendas/{id}/analyze
+calls are in flight. With blocking work offloaded from the event loop the two
+p99 figures should stay close.
+
+Usage:
+    python benchmarks/load_agendas.py --base-url http://localhost:8000 \
+        --email bench@example.com --password secret --agenda-id 1
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def get_token(client, email, password):
+    response = await client.post("/auth/login", json={"email": email, "password": password})
+    if response.status_code == 401:
+        response = await client.post("/auth/register", json={"email": email, "password": password, "name": "bench"})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def measure_listing(client, headers, requests_total, concurrency):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get("/agendas", headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+
+    await asyncio.gather(*(one() for _ in range(requests_total)))
+    return latencies
+
+
+async def keep_analyzing(client, headers, agenda_id, stop):
+    while not stop.is_set():
+        try:
+            await client.post(f"/agendas/{agenda_id}/analyze", params={"force_refresh": True}, headers=headers, timeout=120)
+        except httpx.HTTPError:
+            pass
+
+
+def report(label, latencies):
+    print(
+        f"{label:<22} n={len(latencies):<5} p50={statistics.median(latencies):7.1f}ms "
+        f"p95={percentile(latencies, 95):7.1f}ms p99={percentile(latencies, 99):7.1f}ms "
+        f"max={max(latencies):7.1f}ms"
+    )
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=30) as client:
+        headers = {"Authorization": f"Bearer {await get_token(client, args.email, args.password)}"}
+
+        idle = await measure_listing(client, headers, args.requests, args.concurrency)
+        report("idle", idle)
+
+        stop = asyncio.Event()
+        analyzers = [asyncio.create_task(keep_analyzing(client, headers, args.agenda_id, stop)) for _ in range(args.analyses)]
+        await asyncio.sleep(1)  # let analyses get into scraping / LLM calls
+        loaded = await measure_listing(client, headers, args.requests, args.concurrency)
+        stop.set()
+        report(f"with {args.analyses} analyses", loaded)
+        for task in analyzers:
+            task.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--agenda-id", type=int, required=True, help="agenda to analyze repeatedly (should have articles)")
+    parser.add_argument("--analyses", type=int, default=4, help="concurrent analyses during the loaded phase")
+    parser.add_argument("--requests", type=int, default=500, help="GET /agendas calls per phase")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent GET /agendas calls")
+    asyncio.run(main(parser.parse_args()))
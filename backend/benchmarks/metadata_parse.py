@@ -0,0 +1,104 @@
+"""
+Per-page parse time: single-pass metadata_extractor vs. the previous BeautifulSoup lookup.
+
+Runs both extractors over a corpus of saved pages (*.html in --fixtures) and
+prints mean/median parse time per page. Without --fixtures a synthetic corpus
+shaped like typical news pages (large <head> full of meta/link/script tags,
+JSON-LD, long body) is generated, so the script runs anywhere.
+
+Usage:
+    python benchmarks/metadata_parse.py --fixtures ~/saved-news-pages
+"""
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+from metadata_extractor import parse_metadata  # noqa: E402
+
+
+def soup_extract(html: bytes) -> dict:
+    """The extractor /api/extract used before metadata_extractor (kept here as the baseline)."""
+    soup = BeautifulSoup(html, 'html.parser')
+    title = None
+    if soup.find('meta', property='og:title'):
+        title = soup.find('meta', property='og:title').get('content')
+    elif soup.find('title'):
+        title = soup.find('title').string
+    description = None
+    if soup.find('meta', property='og:description'):
+        description = soup.find('meta', property='og:description').get('content')
+    elif soup.find('meta', attrs={'name': 'description'}):
+        description = soup.find('meta', attrs={'name': 'description'}).get('content')
+    image = None
+    if soup.find('meta', property='og:image'):
+        image = soup.find('meta', property='og:image').get('content')
+    return {"title": title, "description": description, "image": image}
+
+
+def synthetic_page(i: int) -> bytes:
+    head = [f'<meta name="tracking-{n}" content="{"x" * 40}">' for n in range(120)]
+    head += [f'<link rel="preload" href="/static/chunk-{n}.js" as="script">' for n in range(60)]
+    head += [f'<script>window.__cfg{n} = {{"a": {n}, "b": "{"y" * 200}"}};</script>' for n in range(20)]
+    ld = {"@context": "https://schema.org", "@type": "NewsArticle", "headline": f"Headline {i}",
+          "description": "Lead paragraph", "image": [f"https://img.example.com/{i}.jpg"]}
+    body = "".join(f"<div class='para'><p>{'lorem ipsum dolor sit amet ' * 30}</p></div>" for _ in range(400))
+    return (
+        "<!doctype html><html><head><meta charset='utf-8'>"
+        f"<title>Page {i} | Example News</title>"
+        + "".join(head)
+        + f'<script type="application/ld+json">{json.dumps(ld)}</script>'
+        + f'<meta name="description" content="Description {i}">'
+        + f'<meta property="og:image" content="https://img.example.com/{i}.jpg">'
+        + f"</head><body>{body}</body></html>"
+    ).encode("utf-8")
+
+
+def load_corpus(fixtures, count):
+    if fixtures:
+        paths = sorted(pathlib.Path(fixtures).glob("*.html"))
+        return [(p.name, p.read_bytes()) for p in paths]
+    return [(f"synthetic-{i}", synthetic_page(i)) for i in range(count)]
+
+
+def time_per_page(func, corpus, repeat):
+    timings = []
+    for _, html in corpus:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func(html)
+        timings.append((time.perf_counter() - start) / repeat * 1000)
+    return timings
+
+
+def main(args):
+    corpus = load_corpus(args.fixtures, args.count)
+    if not corpus:
+        sys.exit(f"No *.html files in {args.fixtures}")
+    total_kb = sum(len(html) for _, html in corpus) / 1024
+    print(f"{len(corpus)} pages, {total_kb / len(corpus):.0f} KB average")
+
+    baseline = time_per_page(soup_extract, corpus, args.repeat)
+    single_pass = time_per_page(parse_metadata, corpus, args.repeat)
+    for label, timings in (("soup.find (html.parser)", baseline), ("single-pass lxml", single_pass)):
+        print(f"{label:<24} mean={statistics.mean(timings):8.2f}ms median={statistics.median(timings):8.2f}ms")
+    print(f"speedup: {statistics.mean(baseline) / statistics.mean(single_pass):.1f}x")
+
+    if args.verbose:
+        for (name, html) in corpus:
+            print(name, parse_metadata(html))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=os.getenv("METADATA_FIXTURES"), help="directory of saved *.html pages")
+    parser.add_argument("--count", type=int, default=20, help="synthetic pages when no fixtures are given")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--verbose", action="store_true")
+    main(parser.parse_args())
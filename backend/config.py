@@ -17,3 +17,90 @@ ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "http://localhost:5173",
 ]
+
+# Article scraping (evidence excerpts for analysis)
+EXCERPT_FETCH_TIMEOUT = float(os.getenv("EXCERPT_FETCH_TIMEOUT", "4"))  # seconds per request
+EXCERPT_FETCH_DEADLINE = float(os.getenv("EXCERPT_FETCH_DEADLINE", "8"))  # seconds for a whole batch
+EXCERPT_FETCH_WORKERS = int(os.getenv("EXCERPT_FETCH_WORKERS", "16"))
+EXCERPT_FETCH_PER_DOMAIN = int(os.getenv("EXCERPT_FETCH_PER_DOMAIN", "2"))
+
+# Worker pools for blocking I/O (see executors.py)
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))  # sync routes and dependencies
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "4"))  # concurrent scrape + LLM analyses
+
+# Excerpt cache (see excerpt_cache.py)
+EXCERPT_CACHE_TTL = float(os.getenv("EXCERPT_CACHE_TTL", str(24 * 60 * 60)))  # seconds before a conditional refresh
+EXCERPT_CACHE_MEMORY_SIZE = int(os.getenv("EXCERPT_CACHE_MEMORY_SIZE", "2048"))  # entries in the in-process LRU
+EXCERPT_CACHE_MAX_WORDS = int(os.getenv("EXCERPT_CACHE_MAX_WORDS", "600"))  # words stored per excerpt
+
+# Background analysis jobs (see jobs.py)
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))  # seconds a finished job stays pollable
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "1000"))
+
+# Authenticated user resolution (see security.get_current_user)
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))  # seconds; 0 disables the cache
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+# Sign the user profile into access tokens so auth needs no DB lookup at all.
+# Trade-off: profile changes/deletions only take effect once the token is reissued.
+AUTH_EMBED_USER_CLAIMS = os.getenv("AUTH_EMBED_USER_CLAIMS", "false").lower() in ("1", "true", "yes")
+
+# Max bytes of HTML read per page fetch (metadata and excerpts)
+HTML_MAX_BYTES = int(os.getenv("HTML_MAX_BYTES", str(2 * 1024 * 1024)))
+
+# URL metadata / iframe-policy cache (see url_cache.py)
+URL_CACHE_TTL = float(os.getenv("URL_CACHE_TTL", str(6 * 60 * 60)))  # seconds for successful lookups
+URL_CACHE_NEGATIVE_TTL = float(os.getenv("URL_CACHE_NEGATIVE_TTL", "600"))  # seconds for failed lookups
+URL_CACHE_MEMORY_SIZE = int(os.getenv("URL_CACHE_MEMORY_SIZE", "4096"))
+
+# POST /api/extract/batch
+EXTRACT_BATCH_MAX_URLS = int(os.getenv("EXTRACT_BATCH_MAX_URLS", "50"))
+EXTRACT_BATCH_WORKERS = int(os.getenv("EXTRACT_BATCH_WORKERS", "8"))
+
+# Shared outbound HTTP client (see http_client.py)
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "64"))  # distinct hosts kept in the pool
+HTTP_POOL_PER_HOST = int(os.getenv("HTTP_POOL_PER_HOST", "8"))  # keep-alive connections per host
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))  # connection failures only (see http_client.py)
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.3"))  # seconds, doubled per retry
+
+# LLM providers (see llm.py)
+LLM_PROVIDERS = [p.strip() for p in os.getenv("LLM_PROVIDERS", "groq,openrouter").split(",") if p.strip()]  # in order of preference
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "45"))  # seconds per provider call
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))  # consecutive failures before a provider is skipped
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "60"))  # seconds before a tripped provider is tried again
+# Fire the next provider if the current one hasn't answered within this many seconds (0 disables hedging)
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", "8"))  # concurrent provider calls (hedges and fallbacks) across all requests
+
+# Prompt token budget for analysis calls (see evidence_packer.py)
+LLM_PROMPT_TOKENS = int(os.getenv("LLM_PROMPT_TOKENS", "6000"))  # input tokens per call, system prompt included
+LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "2048"))
+LLM_OUTPUT_BASE_TOKENS = int(os.getenv("LLM_OUTPUT_BASE_TOKENS", "400"))  # reasoning + JSON scaffolding
+LLM_AUDIT_OUTPUT_TOKENS = int(os.getenv("LLM_AUDIT_OUTPUT_TOKENS", "80"))  # per audited article
+LLM_EXCERPT_MIN_TOKENS = int(os.getenv("LLM_EXCERPT_MIN_TOKENS", "120"))  # below this an article gets its own call
+LLM_EXCERPT_MAX_TOKENS = int(os.getenv("LLM_EXCERPT_MAX_TOKENS", "900"))
+
+# Map-reduce analysis: audit shards of pending articles in parallel, then one summary call
+LLM_MAP_REDUCE = os.getenv("LLM_MAP_REDUCE", "true").lower() in ("1", "true", "yes")
+LLM_SHARD_SIZE = int(os.getenv("LLM_SHARD_SIZE", "6"))  # max articles per shard call
+LLM_SHARD_WORKERS = int(os.getenv("LLM_SHARD_WORKERS", "8"))  # concurrent shard calls across all analyses
+LLM_SUMMARY_TOKENS = int(os.getenv("LLM_SUMMARY_TOKENS", "400"))  # max_tokens for the reasoning summary
+
+# Public shared-agenda analysis: after a failed LLM run, serve the heuristic
+# result for this long before letting anonymous traffic trigger another one
+SHARED_ANALYSIS_RETRY_AFTER = float(os.getenv("SHARED_ANALYSIS_RETRY_AFTER", "300"))
+
+# Postgres connection pool (see database.BoundedPool)
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "20"))  # hard cap on open connections per process
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))  # seconds to wait for a free connection
+DB_POOL_MAX_WAITERS = int(os.getenv("DB_POOL_MAX_WAITERS", "50"))  # beyond this, fail fast with 503
+DB_POOL_HEALTHCHECK_IDLE = float(os.getenv("DB_POOL_HEALTHCHECK_IDLE", "30"))  # ping connections idle longer than this
+# PREPARE hot queries once per connection (see queries.py); turn off behind
+# a transaction-mode pooler such as PgBouncer, which can't keep them per session
+DB_PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "true").lower() in ("1", "true", "yes")
+# Seconds a schema migration may wait for a table lock before giving up (see migrations.py)
+DB_MIGRATION_LOCK_TIMEOUT = float(os.getenv("DB_MIGRATION_LOCK_TIMEOUT", "10"))
+# Run migrations and the query check in the startup hook. Set to false when
+# `python migrations.py` runs as a separate deploy step, so instances start
+# without touching the database and open the pool on the first request
+DB_INIT_ON_STARTUP = os.getenv("DB_INIT_ON_STARTUP", "true").lower() in ("1", "true", "yes")
@@ -1,26 +1,57 @@
 import psycopg2
-from psycopg2 import pool
+import psycopg2.extensions
 import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
 from dotenv import load_dotenv
 from urllib.parse import urlparse
 load_dotenv()
 
+from config import (
+    DB_POOL_MIN,
+    DB_POOL_MAX,
+    DB_POOL_TIMEOUT,
+    DB_POOL_MAX_WAITERS,
+    DB_POOL_HEALTHCHECK_IDLE,
+)
+
 # Global connection pool
 _db_pool = None
+_pool_lock = threading.Lock()
+
+# Histogram bucket upper bounds, in milliseconds
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class DatabaseUnavailable(Exception):
+    """No database connection could be provided; surfaced to clients as a 503."""
+
+
+class PoolExhausted(DatabaseUnavailable):
+    """Every connection is busy and the wait queue is full or timed out."""
+
 
 def _get_env(name: str, default: str | None = None) -> str | None:
     """Small helper to read env vars consistently."""
     value = os.getenv(name)
     return value if value not in (None, "") else default
 
-def _create_pool():
-    """Create a new connection pool."""
+class Connection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers which statements it has PREPAREd (see queries.py)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+def _connect():
+    """Open a new raw psycopg2 connection."""
     database_url = _get_env("DATABASE_URL")
-    min_conn = 1
-    max_conn = 20
-    
     if database_url:
-        return psycopg2.pool.ThreadedConnectionPool(min_conn, max_conn, database_url)
+        return psycopg2.connect(database_url, connection_factory=Connection)
 
     # Fallback: discrete variables (local setup)
     host = _get_env("DB_HOST", "localhost")
@@ -29,14 +60,190 @@ def _create_pool():
     user = _get_env("DB_USER", "postgres")
     password = _get_env("DB_PASSWORD", "postgres")
 
-    return psycopg2.pool.ThreadedConnectionPool(
-        min_conn,
-        max_conn,
+    return psycopg2.connect(
         host=host,
         port=int(port) if port else 5432,
         dbname=dbname,
         user=user,
         password=password,
+        connection_factory=Connection,
+    )
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus style)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, ms: float):
+        self.n += 1
+        self.total += ms
+        for i, bound in enumerate(self.buckets):
+            if ms <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def snapshot(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {"count": self.n, "sum_ms": round(self.total, 3), "buckets": buckets}
+
+
+class BoundedPool:
+    """
+    Thread-safe Postgres pool that never opens more than `maxconn` connections.
+
+    When all connections are busy, callers wait up to `timeout` seconds for one
+    to be returned; once `max_waiters` callers are already queued, further
+    requests fail immediately. Both cases raise PoolExhausted so the API can
+    answer 503 instead of piling more load onto the database. Connections idle
+    longer than `healthcheck_idle` seconds are pinged before being handed out.
+    """
+
+    def __init__(self, minconn, maxconn, timeout, max_waiters, healthcheck_idle):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_waiters = max_waiters
+        self.healthcheck_idle = healthcheck_idle
+        self._idle = deque()  # (conn, returned_at)
+        self._size = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        # Metrics
+        self.checkouts = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.discarded = 0
+        self.rollbacks = 0
+        self.wait_ms = Histogram()
+        self.hold_ms = Histogram()
+        for _ in range(minconn):
+            self._idle.append((_connect(), time.monotonic()))
+            self._size += 1
+
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            if self._closed:
+                raise DatabaseUnavailable("Connection pool is closed")
+            if not self._idle and self._size >= self.maxconn and self._waiting >= self.max_waiters:
+                self.rejected += 1
+                raise PoolExhausted(f"{self._waiting} requests already waiting for a database connection")
+            while True:
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+                if self._size < self.maxconn:
+                    self._size += 1  # reserve the slot, connect outside the lock
+                    conn, returned_at = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolExhausted(f"No database connection freed up within {self.timeout}s")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        conn = self._checked(conn, returned_at)
+        with self._cond:
+            self.checkouts += 1
+            self.wait_ms.observe((time.monotonic() - started) * 1000)
+        return conn
+
+    def _checked(self, conn, returned_at):
+        """Return a usable connection: ping stale idle ones, replace broken ones."""
+        if conn is not None and not conn.closed:
+            if time.monotonic() - returned_at < self.healthcheck_idle:
+                return conn
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+                return conn
+            except Exception as e:
+                print(f"Discarding broken pooled connection: {e}")
+        if conn is not None:
+            self._close_quietly(conn)
+            with self._cond:
+                self.discarded += 1
+        try:
+            return _connect()
+        except Exception as e:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise DatabaseUnavailable(f"Could not connect to the database: {e}") from e
+
+    def putconn(self, conn, close: bool = False, held_since: float | None = None):
+        if held_since is not None:
+            with self._cond:
+                self.hold_ms.observe((time.monotonic() - held_since) * 1000)
+        if close or conn.closed or self._closed:
+            self._close_quietly(conn)
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self._size,
+                "max": self.maxconn,
+                "in_use": self._size - len(self._idle),
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "rejected": self.rejected,
+                "discarded": self.discarded,
+                "rollbacks": self.rollbacks,
+                "wait_ms": self.wait_ms.snapshot(),
+                "checkout_duration_ms": self.hold_ms.snapshot(),
+            }
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def _create_pool():
+    """Create a new connection pool."""
+    return BoundedPool(
+        DB_POOL_MIN,
+        DB_POOL_MAX,
+        timeout=DB_POOL_TIMEOUT,
+        max_waiters=DB_POOL_MAX_WAITERS,
+        healthcheck_idle=DB_POOL_HEALTHCHECK_IDLE,
     )
 
 class PooledConnection:
@@ -44,13 +251,20 @@ class PooledConnection:
     def __init__(self, pool, conn):
         self._pool = pool
         self._conn = conn
+        self._checked_out_at = time.monotonic()
 
     def close(self):
         """Return connection to pool."""
         if self._conn:
             try:
-                self._conn.rollback() # Ensure no open transaction
-                self._pool.putconn(self._conn)
+                # Only roll back if a transaction is actually open; after a
+                # commit or in autocommit mode that would be a wasted round trip
+                if self._conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                    self._conn.rollback()
+                    self._pool.rollbacks += 1
+                if self._conn.autocommit:
+                    self._conn.autocommit = False
+                self._pool.putconn(self._conn, held_since=self._checked_out_at)
             except Exception as e:
                 print(f"Error returning connection to pool: {e}")
                 # Try to force close if it fails (it might be broken)
@@ -67,126 +281,76 @@ class PooledConnection:
             raise Exception("Connection is closed")
         return getattr(self._conn, name)
 
+    def __setattr__(self, name, value):
+        """Settings such as `autocommit` must land on the real connection."""
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._conn, name, value)
+
+def _get_pool() -> BoundedPool:
+    global _db_pool
+    if _db_pool is None:
+        with _pool_lock:
+            if _db_pool is None:
+                try:
+                    _db_pool = _create_pool()
+                except Exception as e:
+                    print(f"❌ Failed to create connection pool: {e}")
+                    raise DatabaseUnavailable(f"Could not connect to the database: {e}") from e
+                print(f"✅ Database connection pool created (max {DB_POOL_MAX} connections)")
+    return _db_pool
+
 def get_db_connection():
     """
     Get a connection from the pool.
     Returns a wrapped connection object that returns to pool on close().
+    Raises PoolExhausted (503) when none frees up within DB_POOL_TIMEOUT.
     """
-    global _db_pool
-    if _db_pool is None:
-        try:
-            _db_pool = _create_pool()
-            print("✅ Database connection pool created")
-        except Exception as e:
-            print(f"❌ Failed to create connection pool: {e}")
-            # Fallback to direct connection if pool fails
-            return _create_direct_connection()
+    pool = _get_pool()
+    return PooledConnection(pool, pool.getconn())
 
-    try:
-        conn = _db_pool.getconn()
-        return PooledConnection(_db_pool, conn)
-    except Exception as e:
-        print(f"⚠️ Pool exhausted or error, creating temporary connection: {e}")
-        return _create_direct_connection()
-
-def _create_direct_connection():
-    """Fallback: Create a direct connection without pooling."""
-    database_url = _get_env("DATABASE_URL")
-    if database_url:
-        return psycopg2.connect(database_url)
-
-    host = _get_env("DB_HOST", "localhost")
-    port = _get_env("DB_PORT", "5432")
-    dbname = _get_env("DB_NAME", "postgres")
-    user = _get_env("DB_USER", "postgres")
-    password = _get_env("DB_PASSWORD", "postgres")
+@contextmanager
+def transaction():
+    """
+    Run statements in one transaction on a pooled connection:
 
-    return psycopg2.connect(
-        host=host,
-        port=int(port) if port else 5432,
-        dbname=dbname,
-        user=user,
-        password=password,
-    )
+        with db.transaction() as cursor:
+            cursor.execute(...)
 
-def init_db():
-    """
-    Initialize the database by creating necessary tables.
-    This runs on application startup.
+    Commits when the block finishes, rolls back if it raises (including
+    HTTPException), and always returns the connection to the pool.
     """
     conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-
-        # Core tables
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                password_hash VARCHAR(255) NOT NULL,
-                name VARCHAR(255),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS agendas (
-                id SERIAL PRIMARY KEY,
-                title VARCHAR(255) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                share_token VARCHAR(36) UNIQUE
-            )
-        """)
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS articles (
-                id SERIAL PRIMARY KEY,
-                title VARCHAR(255) NOT NULL,
-                url TEXT NOT NULL,
-                description TEXT,
-                image TEXT,
-                agenda_id INTEGER REFERENCES agendas(id) ON DELETE CASCADE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Backward-compatible migrations for existing databases
-        cursor.execute("""
-            ALTER TABLE agendas
-            ADD COLUMN IF NOT EXISTS share_token VARCHAR(36) UNIQUE
-        """)
-        cursor.execute("""
-            ALTER TABLE agendas
-            ADD COLUMN IF NOT EXISTS analysis_score VARCHAR(10)
-        """)
-        cursor.execute("""
-            ALTER TABLE agendas
-            ADD COLUMN IF NOT EXISTS analysis_reasoning TEXT
-        """)
-        cursor.execute("""
-            ALTER TABLE agendas
-            ADD COLUMN IF NOT EXISTS last_analyzed_at TIMESTAMP
-        """)
-        cursor.execute("""
-            ALTER TABLE agendas
-            ADD COLUMN IF NOT EXISTS analysis_article_count INTEGER
-        """)
-        cursor.execute("""
-            ALTER TABLE agendas
-            ADD COLUMN IF NOT EXISTS analysis_numeric_score INTEGER
-        """)
-
-        # Performance indexes
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_agendas_user_id ON agendas(user_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_articles_agenda_id ON articles(agenda_id)")
-
+        yield conn.cursor()
         conn.commit()
-        print("✅ Database schema initialized successfully")
-
-    except Exception as e:
-        print(f"❌ Error initializing database: {e}")
+    except BaseException:
         conn.rollback()
         raise
     finally:
         conn.close()
+
+@contextmanager
+def read():
+    """
+    Read-only counterpart of transaction(): the connection runs in autocommit,
+    so SELECTs need no BEGIN/COMMIT/ROLLBACK round trips at all.
+    """
+    conn = get_db_connection()
+    try:
+        conn.autocommit = True
+        yield conn.cursor()
+    finally:
+        conn.close()
+
+def pool_stats() -> dict | None:
+    """Pool metrics for /health/db, or None before the pool exists."""
+    return _db_pool.stats() if _db_pool is not None else None
+
+def close_db_pool():
+    global _db_pool
+    with _pool_lock:
+        if _db_pool is not None:
+            _db_pool.closeall()
+            _db_pool = None
@@ -0,0 +1,147 @@
+"""
+Token-budgeted packing of evidence into LLM calls.
+
+Token counts are estimated (UTF-8 bytes / 4, which tracks real tokenizers
+closely enough for English and over-counts non-Latin scripts on the safe
+side), so no tokenizer dependency is needed. Evidence is split into as few
+balanced chunks as keep every article at LLM_EXCERPT_MIN_TOKENS or more,
+and each chunk's excerpt budget is shared out max-min fairly: short
+excerpts are sent whole and the room they leave goes to longer ones.
+Audits from earlier runs sent as context are capped (fit_context) so they
+can never crowd the articles being audited down to bare titles.
+"""
+import json
+import math
+from typing import List, Optional
+
+from config import (
+    LLM_PROMPT_TOKENS,
+    LLM_MAX_OUTPUT_TOKENS,
+    LLM_OUTPUT_BASE_TOKENS,
+    LLM_AUDIT_OUTPUT_TOKENS,
+    LLM_EXCERPT_MIN_TOKENS,
+    LLM_EXCERPT_MAX_TOKENS,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return math.ceil(len(text.encode("utf-8")) / 4)
+
+
+def output_tokens_for(n_articles: int) -> int:
+    """max_tokens for a call auditing `n_articles`."""
+    return min(LLM_MAX_OUTPUT_TOKENS, LLM_OUTPUT_BASE_TOKENS + LLM_AUDIT_OUTPUT_TOKENS * n_articles)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` at a word boundary so it fits `max_tokens` (estimated)."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens * 4 - 3  # leave room for the ellipsis
+    kept = []
+    used = 0
+    for word in text.split():
+        size = len(word.encode("utf-8")) + 1
+        if used + size > budget:
+            break
+        kept.append(word)
+        used += size
+    return " ".join(kept) + "..."
+
+
+def _item_overhead(item: dict) -> int:
+    """Tokens an evidence item costs besides its excerpt (ids, title, url, JSON punctuation)."""
+    return estimate_tokens(json.dumps(dict(item, excerpt=""), ensure_ascii=False)) + 2
+
+
+def _allocate(sizes: List[int], budget: int) -> List[int]:
+    """Max-min fair split of `budget` over demands `sizes`."""
+    allocation = [0] * len(sizes)
+    remaining = sorted(range(len(sizes)), key=lambda i: sizes[i])
+    while remaining:
+        share = budget // len(remaining)
+        i = remaining[0]
+        if sizes[i] > share:
+            # Nobody left fits under the fair share: everyone gets it
+            for j in remaining:
+                allocation[j] = share
+            break
+        allocation[i] = sizes[i]
+        budget -= sizes[i]
+        remaining.pop(0)
+    return allocation
+
+
+def _fit_chunk(chunk: List[dict], budget: int) -> List[dict]:
+    excerpt_budget = max(0, budget - sum(_item_overhead(e) for e in chunk))
+    demands = [min(estimate_tokens(e.get("excerpt") or ""), LLM_EXCERPT_MAX_TOKENS) for e in chunk]
+    allocation = _allocate(demands, excerpt_budget)
+    return [
+        dict(e, excerpt=truncate_to_tokens(e.get("excerpt") or "", tokens))
+        for e, tokens in zip(chunk, allocation)
+    ]
+
+
+def fit_context(
+    context: List[dict],
+    evidence: List[dict],
+    fixed_tokens: int,
+    prompt_tokens: int = LLM_PROMPT_TOKENS,
+    min_items: int = 1,
+) -> List[dict]:
+    """
+    Cap the previously-audited `context` sent alongside `evidence` so a chunk
+    of `min_items` articles still fits at LLM_EXCERPT_MIN_TOKENS each.
+    `fixed_tokens` is the prompt without the context. Audits that don't fit
+    are folded into one summary entry (how many, how many support the claim,
+    their mean score), so the model still sees the overall picture.
+    """
+    reserved = sum(_item_overhead(e) + LLM_EXCERPT_MIN_TOKENS for e in evidence[:max(1, min_items)])
+    budget = prompt_tokens - fixed_tokens - reserved
+    costs = [estimate_tokens(json.dumps(item, ensure_ascii=False)) + 1 for item in context]
+    if sum(costs) <= budget:
+        return context
+
+    def summary(rest: List[dict]) -> dict:
+        scores = [item.get("support_score") or 0 for item in rest]
+        return {
+            "id": "others",
+            "audited_articles": len(rest),
+            "supporting": sum(1 for score in scores if score >= 40),
+            "mean_support_score": round(sum(scores) / len(scores)) if scores else 0,
+        }
+
+    budget -= estimate_tokens(json.dumps(summary(context), ensure_ascii=False)) + 1
+    kept = 0
+    used = 0
+    while kept < len(context) and used + costs[kept] <= budget:
+        used += costs[kept]
+        kept += 1
+    return context[:kept] + [summary(context[kept:])]
+
+
+def pack_evidence(
+    evidence: List[dict],
+    fixed_tokens: int = 0,
+    prompt_tokens: int = LLM_PROMPT_TOKENS,
+    max_items: Optional[int] = None,
+) -> List[List[dict]]:
+    """
+    Split `evidence` into chunks that each fit one call of `prompt_tokens`,
+    `fixed_tokens` of which are already taken by the system prompt, claim
+    and instructions, with at most `max_items` articles per chunk. Items are copied with trimmed excerpts; the input is
+    left untouched so fingerprints and cache hashes keep using full excerpts.
+    """
+    if not evidence:
+        return []
+    budget = max(0, prompt_tokens - fixed_tokens)
+    per_item = sum(_item_overhead(e) for e in evidence) / len(evidence) + LLM_EXCERPT_MIN_TOKENS
+    max_by_prompt = int(budget // per_item)
+    max_by_output = (LLM_MAX_OUTPUT_TOKENS - LLM_OUTPUT_BASE_TOKENS) // LLM_AUDIT_OUTPUT_TOKENS
+    per_chunk = max(1, min(max_by_prompt, max_by_output, max_items or len(evidence)))
+
+    n_chunks = math.ceil(len(evidence) / per_chunk)
+    size = math.ceil(len(evidence) / n_chunks)
+    return [_fit_chunk(evidence[i:i + size], budget) for i in range(0, len(evidence), size)]
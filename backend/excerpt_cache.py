@@ -0,0 +1,122 @@
+"""
+Two-tier cache for scraped article excerpts.
+
+Entries are keyed by normalized URL and live in an in-memory LRU backed by the
+`article_excerpts` table, so repeat analyses (and other workers/restarts) skip
+the network. Each entry keeps the page's ETag/Last-Modified validators so an
+expired entry can be refreshed with a conditional GET.
+"""
+import hashlib
+import time
+from typing import Dict, Iterable, List, Optional
+
+from psycopg2.extras import execute_values
+
+from cache import LRUCache, normalize_url
+from config import EXCERPT_CACHE_TTL, EXCERPT_CACHE_MEMORY_SIZE
+import database as db
+
+_memory = LRUCache(maxsize=EXCERPT_CACHE_MEMORY_SIZE)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_entry(url: str, excerpt: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> dict:
+    return {
+        "key": normalize_url(url),
+        "url": url,
+        "excerpt": excerpt,
+        "content_hash": content_hash(excerpt),
+        "etag": etag,
+        "last_modified": last_modified,
+        "fetched_at": time.time(),
+    }
+
+
+def is_fresh(entry: Optional[dict]) -> bool:
+    return entry is not None and time.time() - entry["fetched_at"] < EXCERPT_CACHE_TTL
+
+
+def get_entries(urls: Iterable[str]) -> Dict[str, dict]:
+    """
+    Look up cached entries for `urls`, returned by normalized key.
+    Keys missing from memory are loaded from Postgres in one query.
+    """
+    keys = {normalize_url(u) for u in urls if u}
+    found = {}
+    missing = []
+    for key in keys:
+        entry = _memory.get(key)
+        if entry is None:
+            missing.append(key)
+        else:
+            found[key] = entry
+
+    if missing:
+        for entry in _load(missing):
+            _memory.set(entry["key"], entry)
+            found[entry["key"]] = entry
+    return found
+
+
+def store_entries(entries: List[dict]) -> None:
+    """Write fresh or revalidated entries to both tiers."""
+    # One row per key: a single INSERT ... ON CONFLICT DO UPDATE can't touch
+    # the same row twice
+    by_key = {entry["key"]: entry for entry in entries}
+    if not by_key:
+        return
+    for entry in by_key.values():
+        _memory.set(entry["key"], entry)
+    _save(list(by_key.values()))
+
+
+def _load(keys: List[str]) -> List[dict]:
+    try:
+        with db.read() as cursor:
+            cursor.execute(
+                """SELECT url_key, url, excerpt, content_hash, etag, last_modified, EXTRACT(EPOCH FROM fetched_at)
+                   FROM article_excerpts WHERE url_key = ANY(%s)""",
+                (keys,)
+            )
+            return [
+                {
+                    "key": r[0],
+                    "url": r[1],
+                    "excerpt": r[2],
+                    "content_hash": r[3],
+                    "etag": r[4],
+                    "last_modified": r[5],
+                    "fetched_at": float(r[6]),
+                }
+                for r in cursor.fetchall()
+            ]
+    except Exception as e:
+        print(f"Excerpt cache read failed: {e}")
+        return []
+
+
+def _save(entries: List[dict]) -> None:
+    try:
+        with db.transaction() as cursor:
+            execute_values(
+                cursor,
+                """INSERT INTO article_excerpts (url_key, url, excerpt, content_hash, etag, last_modified, fetched_at)
+                   VALUES %s
+                   ON CONFLICT (url_key) DO UPDATE SET
+                       url = EXCLUDED.url,
+                       excerpt = EXCLUDED.excerpt,
+                       content_hash = EXCLUDED.content_hash,
+                       etag = EXCLUDED.etag,
+                       last_modified = EXCLUDED.last_modified,
+                       fetched_at = EXCLUDED.fetched_at""",
+                [
+                    (e["key"], e["url"], e["excerpt"], e["content_hash"], e["etag"], e["last_modified"], e["fetched_at"])
+                    for e in entries
+                ],
+                template="(%s, %s, %s, %s, %s, %s, to_timestamp(%s))"
+            )
+    except Exception as e:
+        print(f"Excerpt cache write failed: {e}")
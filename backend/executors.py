@@ -0,0 +1,34 @@
+"""
+Thread pools that keep blocking work (psycopg2, requests, Groq, bcrypt) off the event loop.
+
+Plain `def` routes and dependencies run on AnyIO's shared worker pool, sized
+by THREADPOOL_SIZE. Long-running analyses get their own ANALYSIS_WORKERS pool
+so a burst of scraping/LLM calls can never starve ordinary CRUD requests.
+Map-reduce analyses fan their shard calls out on LLM_SHARD_WORKERS.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import anyio.to_thread
+
+from config import THREADPOOL_SIZE, ANALYSIS_WORKERS, LLM_SHARD_WORKERS
+
+analysis_executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="analysis")
+shard_executor = ThreadPoolExecutor(max_workers=LLM_SHARD_WORKERS, thread_name_prefix="llm-shard")
+
+
+def configure_threadpool():
+    """Resize the default worker pool used for sync routes. Must run inside the event loop."""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+
+async def run_analysis(func, *args, **kwargs):
+    """Run a blocking analysis function on the dedicated analysis pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(analysis_executor, partial(func, *args, **kwargs))
+
+
+def shutdown_executors():
+    analysis_executor.shutdown(wait=False, cancel_futures=True)
+    shard_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,72 @@
+"""
+Application-scoped HTTP client for all outbound scraping and LLM traffic.
+
+One requests.Session with a pooled HTTPAdapter is shared by every thread, so
+repeated calls to the same publisher (or to OpenRouter) reuse keep-alive
+connections instead of paying DNS + TCP + TLS setup each time. The retry
+policy lives here too, so every caller backs off the same way.
+
+Only failures to connect are retried. Most traffic goes to arbitrary
+user-supplied URLs, so read timeouts and error statuses are not retried,
+and Retry-After is never honoured: urllib3 would sleep for the full header
+value, whatever the request timeout, and hold a worker thread that long.
+"""
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import HTTP_POOL_HOSTS, HTTP_POOL_PER_HOST, HTTP_RETRIES, HTTP_RETRY_BACKOFF
+
+_session: Optional[requests.Session] = None
+_lock = threading.Lock()
+
+
+def _build_session() -> requests.Session:
+    # Connection failures are retried for any method since nothing reached the
+    # server; a read timeout would repeat the caller's whole timeout each time
+    retry = Retry(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        read=0,
+        status=0,
+        other=0,
+        backoff_factor=HTTP_RETRY_BACKOFF,
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_HOSTS,
+        pool_maxsize=HTTP_POOL_PER_HOST,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """The shared session; created on first use outside the app (scripts, benchmarks)."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def init_http_client():
+    """Create the shared session at startup."""
+    get_session()
+
+
+def close_http_client():
+    """Close pooled connections at shutdown."""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
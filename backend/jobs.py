@@ -0,0 +1,157 @@
+"""
+In-process background job queue for long-running analyses.
+
+Jobs run on the shared analysis pool (ANALYSIS_WORKERS threads), are
+de-duplicated by key while queued or running, and keep their result for
+JOB_RESULT_TTL seconds so clients can poll or stream it. A job can also
+record progress events, which every subscriber receives from the start,
+however late it joins, followed by a final `result` or `error` event.
+"""
+import asyncio
+import threading
+import uuid
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from cache import LRUCache
+from config import JOB_RESULT_TTL, JOB_HISTORY_SIZE
+from executors import analysis_executor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    """A single unit of background work and its outcome."""
+
+    def __init__(self, key: Hashable, owner_id: Optional[int] = None, agenda_id: Optional[int] = None):
+        self.id = str(uuid.uuid4())
+        self.key = key
+        self.owner_id = owner_id
+        self.agenda_id = agenda_id
+        self.status = QUEUED
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.error_status: Optional[int] = None
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.future: Optional[Future] = None
+        self._events: List[Tuple[str, Any]] = []
+        self._listeners: List[Callable[[str, Any], None]] = []
+        self._events_lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def emit(self, event: str, data: Any):
+        """Record a progress event and pass it to every subscriber (called from the worker)."""
+        with self._events_lock:
+            self._events.append((event, data))
+            for listener in self._listeners:
+                listener(event, data)
+
+    def subscribe(self, listener: Callable[[str, Any], None]):
+        """Replay the events so far to `listener`, then pass it every new one until the job ends."""
+        with self._events_lock:
+            for event, data in self._events:
+                listener(event, data)
+            if not self._closed:
+                self._listeners.append(listener)
+
+    def _close(self):
+        if self.status == DONE:
+            self.emit("result", self.result)
+        else:
+            detail = self.error if self.error_status != 500 else "Analysis failed"
+            self.emit("error", {"status_code": self.error_status, "detail": detail})
+        with self._events_lock:
+            self._closed = True
+            self._listeners.clear()
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "agenda_id": self.agenda_id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    def __init__(self):
+        self._jobs = LRUCache(maxsize=JOB_HISTORY_SIZE)
+        self._active: Dict[Hashable, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, func: Callable, *args, owner_id: Optional[int] = None,
+               agenda_id: Optional[int] = None, also: Iterable[Hashable] = (),
+               progress: bool = False, **kwargs) -> Tuple[Job, bool]:
+        """
+        Queue `func(*args, **kwargs)` unless a job with the same key, or one of
+        the `also` keys whose result would do just as well, is already queued
+        or running. With `progress`, func gets `on_event=job.emit`.
+        Returns (job, created).
+        """
+        with self._lock:
+            for candidate in (key, *also):
+                existing = self._active.get(candidate)
+                if existing is not None:
+                    return existing, False
+            job = Job(key, owner_id=owner_id, agenda_id=agenda_id)
+            if progress:
+                kwargs["on_event"] = job.emit
+            self._active[key] = job
+            self._jobs.set(job.id, job)
+            job.future = analysis_executor.submit(self._run, job, func, args, kwargs)
+            return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def _run(self, job: Job, func: Callable, args: tuple, kwargs: dict) -> Any:
+        job.status = RUNNING
+        try:
+            job.result = func(*args, **kwargs)
+            job.status = DONE
+        except HTTPException as e:
+            job.error = str(e.detail)
+            job.error_status = e.status_code
+            job.status = FAILED
+        except Exception as e:
+            print(f"Background job {job.id} failed: {e}")
+            job.error = str(e)
+            job.error_status = 500
+            job.status = FAILED
+        finally:
+            job.finished_at = datetime.utcnow()
+            # Finished jobs stay pollable for JOB_RESULT_TTL
+            self._jobs.set(job.id, job, ttl=JOB_RESULT_TTL)
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+            job._close()
+        return job.result
+
+
+async def wait_for_job(job: Job, timeout: float) -> bool:
+    """Wait (without blocking the event loop) up to `timeout` seconds; True if the job finished."""
+    if job.finished:
+        return True
+    try:
+        await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), timeout)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+analysis_jobs = JobQueue()
@@ -0,0 +1,429 @@
+"""
+LLM provider registry.
+
+Each provider keeps one long-lived client. complete_json() walks the
+providers in LLM_PROVIDERS order and returns the first parsed JSON reply:
+
+- a per-provider circuit breaker skips a provider after LLM_BREAKER_FAILURES
+  consecutive failures, instead of paying its timeout on every analysis,
+  and lets one trial call through after LLM_BREAKER_RESET seconds;
+- with LLM_HEDGE_AFTER set, the next provider is fired as soon as the current
+  one has been silent that long, and whichever answers first wins.
+"""
+import abc
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional
+
+from config import (
+    LLM_PROVIDERS,
+    LLM_TIMEOUT,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET,
+    LLM_HEDGE_AFTER,
+    LLM_WORKERS,
+    LLM_MAX_OUTPUT_TOKENS,
+)
+from http_client import get_session
+
+if TYPE_CHECKING:
+    from groq import Groq
+
+
+class LLMError(Exception):
+    """A provider call failed or returned something unusable."""
+
+
+def parse_llm_json(content: str) -> dict:
+    """Extract the JSON object from a model reply that may be wrapped in markdown."""
+    content = content.strip()
+    # Clean content if it has markdown code blocks
+    if "```json" in content:
+        content = content.replace("```json", "").replace("```", "")
+    elif "```" in content:
+        content = content.replace("```", "")
+
+    start_idx = content.find('{')
+    end_idx = content.rfind('}')
+    if start_idx != -1 and end_idx != -1:
+        content = content[start_idx:end_idx+1]
+
+    return json.loads(content)
+
+
+class JSONArrayStream:
+    """
+    Pull complete objects out of `"<key>": [ {...}, {...} ]` while the JSON
+    text is still arriving, so each array item can be used as soon as its
+    closing brace is streamed.
+    """
+
+    def __init__(self, key: str):
+        self._start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+        self._buffer = ""
+        self._pos: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item_start: Optional[int] = None
+        self._closed = False
+
+    def feed(self, text: str) -> List[dict]:
+        self._buffer += text
+        items = []
+        if self._closed:
+            return items
+        if self._pos is None:
+            match = self._start.search(self._buffer)
+            if not match:
+                return items
+            self._pos = match.end()
+
+        buf = self._buffer
+        i = self._pos
+        while i < len(buf):
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c == "{":
+                if self._depth == 0:
+                    self._item_start = i
+                self._depth += 1
+            elif c == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._item_start is not None:
+                    try:
+                        item = json.loads(buf[self._item_start:i + 1])
+                        if isinstance(item, dict):
+                            items.append(item)
+                    except ValueError:
+                        pass
+                    self._item_start = None
+            elif c == "]" and self._depth == 0:
+                self._closed = True
+                break
+            i += 1
+        self._pos = i
+        return items
+
+
+class CircuitBreaker:
+    """Closed -> open after `threshold` consecutive failures -> half-open after `reset_after` seconds."""
+
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_after or self._trial_in_flight:
+                return False
+            # Half-open: let a single trial call through
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self.opened_at >= self.reset_after else "open"
+
+
+class LLMProvider(abc.ABC):
+    """Base class: subclasses implement complete() and return the raw reply text."""
+
+    name = ""
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET)
+
+    @abc.abstractmethod
+    def configured(self) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def complete(self, messages: list, max_tokens: int = LLM_MAX_OUTPUT_TOKENS) -> str:
+        ...
+
+    def stream(self, messages: list, max_tokens: int = LLM_MAX_OUTPUT_TOKENS) -> Iterator[str]:
+        """Yield the reply as text deltas; providers without streaming yield it whole."""
+        yield self.complete(messages, max_tokens=max_tokens)
+
+    def close(self):
+        pass
+
+
+class GroqProvider(LLMProvider):
+    name = "groq"
+
+    def __init__(self):
+        super().__init__()
+        self.api_key = os.getenv("GROQ_API_KEY")
+        self.model = os.getenv("GROQ_LLAMA_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct")
+        self._client: Optional["Groq"] = None
+        self._lock = threading.Lock()
+
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    @property
+    def client(self) -> "Groq":
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    # Imported on first call: the SDK (and httpx under it) is the
+                    # heaviest import in the app and most requests never need it
+                    from groq import Groq
+                    # Retries/backoff are handled by the registry's fallback chain
+                    self._client = Groq(api_key=self.api_key, timeout=LLM_TIMEOUT, max_retries=0)
+        return self._client
+
+    def complete(self, messages: list, max_tokens: int = LLM_MAX_OUTPUT_TOKENS) -> str:
+        chat_completion = self.client.chat.completions.create(
+            messages=messages,
+            model=self.model,
+            temperature=0.3,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"}
+        )
+        return chat_completion.choices[0].message.content
+
+    def stream(self, messages: list, max_tokens: int = LLM_MAX_OUTPUT_TOKENS) -> Iterator[str]:
+        # JSON mode can't be combined with streaming; the system prompt asks for JSON anyway
+        stream = self.client.chat.completions.create(
+            messages=messages,
+            model=self.model,
+            temperature=0.3,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+
+class OpenRouterProvider(LLMProvider):
+    name = "openrouter"
+
+    def __init__(self):
+        super().__init__()
+        self.api_key = os.getenv("OPENROUTER_API_KEY")
+        self.model = os.getenv("OPENROUTER_MODEL", "openai/gpt-oss-20b:free")
+
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def _post(self, messages: list, max_tokens: int, stream: bool = False):
+        response = get_session().post(
+            "https://openrouter.ai/api/v1/chat/completions",
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+                "HTTP-Referer": "http://localhost:3000",
+                "X-Title": "Agenda App"
+            },
+            json={
+                "model": self.model,
+                "messages": messages,
+                "max_tokens": max_tokens,
+                "stream": stream
+            },
+            timeout=LLM_TIMEOUT,
+            stream=stream
+        )
+        if response.status_code != 200:
+            raise LLMError(f"{response.status_code} - {response.text}")
+        return response
+
+    def complete(self, messages: list, max_tokens: int = LLM_MAX_OUTPUT_TOKENS) -> str:
+        return self._post(messages, max_tokens).json()['choices'][0]['message']['content']
+
+    def stream(self, messages: list, max_tokens: int = LLM_MAX_OUTPUT_TOKENS) -> Iterator[str]:
+        response = self._post(messages, max_tokens, stream=True)
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                # SSE: "data: {...}" frames, ": comment" keep-alives, "data: [DONE]" at the end
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or []
+                if choices and choices[0].get("delta", {}).get("content"):
+                    yield choices[0]["delta"]["content"]
+        finally:
+            response.close()
+
+
+PROVIDER_TYPES = {
+    GroqProvider.name: GroqProvider,
+    OpenRouterProvider.name: OpenRouterProvider,
+}
+
+_providers: Optional[Dict[str, LLMProvider]] = None
+_providers_lock = threading.Lock()
+
+# Hedged and fallback calls run here so a slow provider never blocks the caller
+_executor = ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix="llm")
+
+
+def get_providers() -> List[LLMProvider]:
+    """Configured providers in LLM_PROVIDERS order (created once per process)."""
+    global _providers
+    if _providers is None:
+        with _providers_lock:
+            if _providers is None:
+                providers = {}
+                for name in LLM_PROVIDERS:
+                    if name not in PROVIDER_TYPES:
+                        print(f"Unknown LLM provider '{name}' in LLM_PROVIDERS, ignoring")
+                        continue
+                    providers[name] = PROVIDER_TYPES[name]()
+                _providers = providers
+    return [p for p in _providers.values() if p.configured()]
+
+
+def _attempt(provider: LLMProvider, messages: list, max_tokens: int) -> Optional[dict]:
+    started = time.perf_counter()
+    try:
+        parsed = parse_llm_json(provider.complete(messages, max_tokens=max_tokens))
+    except Exception as e:
+        provider.breaker.record_failure()
+        print(f"LLM provider '{provider.name}' failed after {time.perf_counter() - started:.1f}s "
+              f"(breaker {provider.breaker.state}): {e}")
+        return None
+    provider.breaker.record_success()
+    print(f"LLM provider '{provider.name}' answered in {time.perf_counter() - started:.1f}s")
+    return parsed
+
+
+def complete_json(messages: list, max_tokens: int = LLM_MAX_OUTPUT_TOKENS) -> Optional[dict]:
+    """
+    Send `messages` to the providers in order and return the first parsed
+    JSON reply, or None if every provider failed or is tripped.
+    """
+    queue = get_providers()
+    pending = {}
+    launched = 0
+    timed_out = False
+    while queue or pending:
+        # Start the next provider when nothing is running (fallback) or the
+        # running one blew its hedge budget. The breaker is consulted only
+        # at launch so a half-open trial slot is never claimed and left unused.
+        while queue and (not pending or timed_out):
+            provider = queue.pop(0)
+            if not provider.breaker.allow():
+                print(f"LLM provider '{provider.name}' skipped (breaker {provider.breaker.state})")
+                continue
+            if pending:
+                print(f"Hedging: '{provider.name}' fired after {LLM_HEDGE_AFTER}s without an answer")
+            pending[_executor.submit(_attempt, provider, messages, max_tokens)] = provider
+            launched += 1
+            break
+        if not pending:
+            break
+
+        hedge_timeout = LLM_HEDGE_AFTER if LLM_HEDGE_AFTER > 0 and queue else None
+        done, _ = wait(pending, timeout=hedge_timeout, return_when=FIRST_COMPLETED)
+        timed_out = not done
+        for future in done:
+            pending.pop(future)
+            parsed = future.result()
+            if parsed is not None:
+                # Losing hedged calls finish in the background and still feed their breakers
+                return parsed
+
+    if not launched:
+        print("No LLM provider available (none configured or all circuit breakers open)")
+    return None
+
+
+def stream_json(
+    messages: list,
+    on_item: Callable[[dict], None],
+    key: str = "article_audits",
+    max_tokens: int = LLM_MAX_OUTPUT_TOKENS,
+) -> Optional[dict]:
+    """
+    Streaming variant of complete_json: `on_item` is called with each object of
+    the `key` array as soon as it has been generated, and the whole parsed
+    reply is returned at the end. Providers are tried in order (no hedging).
+    If a provider fails mid-stream the next one starts over, so consumers
+    should treat items as keyed updates, not appends.
+    """
+    for provider in get_providers():
+        if not provider.breaker.allow():
+            print(f"LLM provider '{provider.name}' skipped (breaker {provider.breaker.state})")
+            continue
+        started = time.perf_counter()
+        first_item_at = None
+        parser = JSONArrayStream(key)
+        parts = []
+        try:
+            for delta in provider.stream(messages, max_tokens=max_tokens):
+                parts.append(delta)
+                for item in parser.feed(delta):
+                    if first_item_at is None:
+                        first_item_at = time.perf_counter() - started
+                    on_item(item)
+            parsed = parse_llm_json("".join(parts))
+        except Exception as e:
+            provider.breaker.record_failure()
+            print(f"LLM provider '{provider.name}' stream failed after {time.perf_counter() - started:.1f}s "
+                  f"(breaker {provider.breaker.state}): {e}")
+            continue
+        provider.breaker.record_success()
+        first = f", first item at {first_item_at:.1f}s" if first_item_at is not None else ""
+        print(f"LLM provider '{provider.name}' streamed in {time.perf_counter() - started:.1f}s{first}")
+        return parsed
+    print("No LLM provider answered the stream (none configured, tripped or all failed)")
+    return None
+
+
+def provider_status() -> List[dict]:
+    """Circuit breaker state per provider for /health/llm; empty until the first LLM call creates them."""
+    providers = _providers or {}
+    return [{"name": p.name, "breaker": p.breaker.state, "failures": p.breaker.failures} for p in providers.values()]
+
+
+def close_providers():
+    if _providers:
+        for provider in _providers.values():
+            provider.close()
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -4,11 +4,20 @@ Agenda Backend API
 Main application entry point that sets up FastAPI app with CORS
 and includes all router modules for clean separation of concerns.
 """
+import time
 
-from fastapi import FastAPI
+_import_started = time.monotonic()
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from database import init_db
-from fastapi.responses import Response
+from config import DB_INIT_ON_STARTUP
+from database import close_db_pool, pool_stats, DatabaseUnavailable
+from executors import configure_threadpool, shutdown_executors
+from http_client import init_http_client, close_http_client
+from llm import close_providers, provider_status
+from migrations import migrate
+from queries import check_queries, query_stats
+from fastapi.responses import JSONResponse, Response
 
 print("Loading Agenda API...")
 print("Importing routers...")
@@ -60,6 +69,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 @app.options("/{path:path}")
@@ -72,6 +82,16 @@ app.include_router(agendas.router, prefix="/agendas", tags=["agendas"])
 app.include_router(articles.router, tags=["articles"])
 app.include_router(metadata.router, prefix="/api", tags=["metadata"])
 
+@app.exception_handler(DatabaseUnavailable)
+async def database_unavailable_handler(request: Request, exc: DatabaseUnavailable):
+    # Pool saturated or database down: shed load instead of queueing more work
+    print(f"503 for {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service busy, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -81,17 +101,47 @@ async def root():
         "docs": "/docs"
     }
 
+@app.get("/health/db")
+async def database_health():
+    """
+    Connection pool metrics (size, in-use, waiting, wait-time and
+    checkout-duration histograms) and per-query call counts and latency.
+    """
+    return {"pool": pool_stats(), "queries": query_stats()}
+
+@app.get("/health/llm")
+async def llm_health():
+    """Circuit breaker state and consecutive failures for each LLM provider."""
+    return {"providers": provider_status()}
+
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
     print("Starting up...")
-    try:
-        init_db()
-    except Exception as e:
-        print(f"❌ Failed to initialize database: {e}")
-        import traceback
-        traceback.print_exc()
-        raise
+    started = time.monotonic()
+    configure_threadpool()
+    init_http_client()
+    if DB_INIT_ON_STARTUP:
+        try:
+            migrate()
+            check_queries()
+        except Exception as e:
+            print(f"❌ Failed to initialize database: {e}")
+            import traceback
+            traceback.print_exc()
+            raise
+    else:
+        print("Skipping database init (DB_INIT_ON_STARTUP=false)")
+    now = time.monotonic()
+    print(f"✅ Startup complete: {now - started:.2f}s in startup hook, {now - _import_started:.2f}s since main was imported")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_executors()
+    close_providers()
+    close_http_client()
+    close_db_pool()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+Single-pass page metadata extractor.
+
+Feeds the document once through lxml's C HTML parser with a collecting
+target, so no tree is built and every <meta>, <link>, <title> and JSON-LD
+block is gathered in one sweep instead of one soup.find() scan per field.
+"""
+import json
+from typing import Optional
+
+
+class _MetadataCollector:
+    """lxml parser target that records only the tags metadata comes from."""
+
+    def __init__(self):
+        self.meta = {}
+        self.links = {}
+        self.title_parts = []
+        self.json_ld = []
+        self._capture = None  # "title" or "json_ld" while inside those elements
+        self._buffer = []
+
+    def start(self, tag, attrib):
+        tag = tag.lower() if isinstance(tag, str) else tag
+        if tag == "meta":
+            key = (attrib.get("property") or attrib.get("name") or "").strip().lower()
+            content = attrib.get("content")
+            # First occurrence wins, matching soup.find() semantics
+            if key and content and key not in self.meta:
+                self.meta[key] = content.strip()
+        elif tag == "link":
+            rel = (attrib.get("rel") or "").strip().lower()
+            href = attrib.get("href")
+            if rel and href and rel not in self.links:
+                self.links[rel] = href.strip()
+        elif tag == "title" and not self.title_parts:
+            self._capture, self._buffer = "title", []
+        elif tag == "script" and (attrib.get("type") or "").strip().lower() == "application/ld+json":
+            self._capture, self._buffer = "json_ld", []
+
+    def data(self, text):
+        if self._capture:
+            self._buffer.append(text)
+
+    def end(self, tag):
+        if self._capture == "title" and tag == "title":
+            self.title_parts = self._buffer
+            self._capture = None
+        elif self._capture == "json_ld" and tag == "script":
+            self.json_ld.append("".join(self._buffer))
+            self._capture = None
+
+    def close(self):
+        return self
+
+
+def _json_ld_objects(blocks):
+    """Flatten JSON-LD blocks (objects, lists and @graph containers) into dicts."""
+    for block in blocks:
+        try:
+            data = json.loads(block)
+        except (ValueError, TypeError):
+            continue
+        stack = [data]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, list):
+                stack.extend(item)
+            elif isinstance(item, dict):
+                yield item
+                if isinstance(item.get("@graph"), list):
+                    stack.extend(item["@graph"])
+
+
+def _json_ld_image(value) -> Optional[str]:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list) and value:
+        return _json_ld_image(value[0])
+    if isinstance(value, dict):
+        return value.get("url")
+    return None
+
+
+def parse_metadata(html: bytes, encoding: Optional[str] = None) -> dict:
+    """
+    Extract title, description and image from an HTML document in one pass.
+
+    Precedence per field:
+      title:       og:title > twitter:title > JSON-LD headline/name > <title>
+      description: og:description > twitter:description > meta description > JSON-LD description
+      image:       og:image > twitter:image > JSON-LD image > <link rel="image_src">
+    """
+    from lxml import etree  # deferred to the first extraction to keep startup fast
+
+    collector = _MetadataCollector()
+    try:
+        parser = etree.HTMLParser(target=collector, encoding=encoding, recover=True)
+    except LookupError:
+        # libxml2 doesn't know every charset name a server sends ("latin-1",
+        # "utf8mb4", ...); let it sniff <meta charset> instead of failing
+        parser = etree.HTMLParser(target=collector, recover=True)
+    try:
+        parser.feed(html)
+        parser.close()
+    except etree.LxmlError:
+        pass  # keep whatever was collected before the parser gave up
+
+    meta = collector.meta
+    ld = next(
+        (obj for obj in _json_ld_objects(collector.json_ld) if obj.get("headline") or obj.get("name")),
+        {}
+    )
+    ld = {k: v for k, v in ld.items() if isinstance(v, str) or k == "image"}
+    page_title = "".join(collector.title_parts).strip() or None
+
+    return {
+        "title": meta.get("og:title") or meta.get("twitter:title") or ld.get("headline") or ld.get("name") or page_title,
+        "description": meta.get("og:description") or meta.get("twitter:description") or meta.get("description") or ld.get("description"),
+        "image": meta.get("og:image") or meta.get("twitter:image") or _json_ld_image(ld.get("image")) or collector.links.get("image_src"),
+    }
@@ -0,0 +1,227 @@
+"""
+Versioned schema migrations.
+
+Each migration runs once per database and is recorded in `schema_version`.
+migrate() runs at startup. When the schema is already current, it costs two
+small reads and takes no locks, so extra workers and rolling deploys don't
+touch the hot tables. Otherwise the process takes a Postgres advisory lock.
+Exactly one process applies the pending migrations; the others wait for it
+and then find nothing left to do.
+
+Migrations are append-only: never edit one that has shipped, add a new one.
+Indexes go in `indexes` and are built CONCURRENTLY, outside a transaction,
+so writes to the table continue during the build.
+
+Run out of band with:
+    python migrations.py
+"""
+import time
+from typing import Sequence, Tuple
+
+import database as db
+from config import DB_MIGRATION_LOCK_TIMEOUT
+
+# Application-wide key for pg_advisory_lock; any constant works as long as it's shared
+MIGRATION_LOCK_ID = 4_170_024
+MIGRATION_POLL_INTERVAL = 1.0  # seconds between attempts to take the lock
+
+
+class Migration:
+    """
+    One schema step. `statements` run in a single transaction together with
+    the schema_version insert. `indexes` are (name, "ON table (...)") pairs,
+    built CONCURRENTLY afterwards.
+    """
+
+    def __init__(self, version: int, description: str, statements: Sequence[str] = (),
+                 indexes: Sequence[Tuple[str, str]] = ()):
+        self.version = version
+        self.description = description
+        self.statements = statements
+        self.indexes = indexes
+
+
+MIGRATIONS = [
+    # Everything the old init_db() created, idempotent so existing databases
+    # are adopted as-is
+    Migration(1, "baseline schema", [
+        """CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            email VARCHAR(255) UNIQUE NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            name VARCHAR(255),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS agendas (
+            id SERIAL PRIMARY KEY,
+            title VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            share_token VARCHAR(36) UNIQUE
+        )""",
+        """CREATE TABLE IF NOT EXISTS articles (
+            id SERIAL PRIMARY KEY,
+            title VARCHAR(255) NOT NULL,
+            url TEXT NOT NULL,
+            description TEXT,
+            image TEXT,
+            agenda_id INTEGER REFERENCES agendas(id) ON DELETE CASCADE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS article_excerpts (
+            url_key TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            excerpt TEXT NOT NULL,
+            content_hash CHAR(64) NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            fetched_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS article_audits (
+            claim_hash CHAR(64) NOT NULL,
+            url_key TEXT NOT NULL,
+            excerpt_hash CHAR(64) NOT NULL,
+            topic TEXT,
+            verdict VARCHAR(32),
+            score INTEGER NOT NULL,
+            audited_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (claim_hash, url_key)
+        )""",
+        """CREATE TABLE IF NOT EXISTS url_metadata_cache (
+            kind VARCHAR(16) NOT NULL,
+            url_key TEXT NOT NULL,
+            ok BOOLEAN NOT NULL,
+            payload JSONB NOT NULL,
+            expires_at TIMESTAMPTZ NOT NULL,
+            PRIMARY KEY (kind, url_key)
+        )""",
+        # Columns added to agendas over time, one ALTER so the table is locked once
+        """ALTER TABLE agendas
+            ADD COLUMN IF NOT EXISTS share_token VARCHAR(36) UNIQUE,
+            ADD COLUMN IF NOT EXISTS analysis_score VARCHAR(10),
+            ADD COLUMN IF NOT EXISTS analysis_reasoning TEXT,
+            ADD COLUMN IF NOT EXISTS last_analyzed_at TIMESTAMP,
+            ADD COLUMN IF NOT EXISTS analysis_article_count INTEGER,
+            ADD COLUMN IF NOT EXISTS analysis_numeric_score INTEGER,
+            ADD COLUMN IF NOT EXISTS analysis_fingerprint CHAR(64),
+            ADD COLUMN IF NOT EXISTS analysis_article_scores JSONB""",
+    ]),
+    Migration(2, "ownership and keyset pagination indexes", indexes=[
+        ("idx_agendas_user_id", "ON agendas (user_id)"),
+        ("idx_articles_agenda_id", "ON articles (agenda_id)"),
+        # Keyset pagination: (owner, created_at DESC, id DESC) matches the listing ORDER BY
+        ("idx_agendas_user_created", "ON agendas (user_id, created_at DESC, id DESC)"),
+        ("idx_articles_agenda_created", "ON articles (agenda_id, created_at DESC, id DESC)"),
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def current_version(cursor) -> int:
+    cursor.execute("SELECT to_regclass('schema_version') IS NOT NULL")
+    if not cursor.fetchone()[0]:
+        return 0
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cursor.fetchone()[0]
+
+
+def _build_index(cursor, name: str, definition: str):
+    # A CONCURRENTLY build that was interrupted leaves an INVALID index behind,
+    # which IF NOT EXISTS would then skip forever; drop it and start over
+    cursor.execute(
+        """SELECT NOT i.indisvalid FROM pg_index i
+           JOIN pg_class c ON c.oid = i.indexrelid
+           WHERE c.relname = %s""",
+        (name,)
+    )
+    row = cursor.fetchone()
+    if row and row[0]:
+        print(f"Rebuilding invalid index {name}")
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    cursor.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}")
+
+
+def _apply(conn, migration: Migration):
+    started = time.monotonic()
+    if migration.statements:
+        conn.autocommit = False
+        try:
+            cursor = conn.cursor()
+            # Fail rather than wait behind long queries while every request queues behind us
+            cursor.execute("SET LOCAL lock_timeout = %s", (f"{int(DB_MIGRATION_LOCK_TIMEOUT * 1000)}ms",))
+            for statement in migration.statements:
+                cursor.execute(statement)
+            if not migration.indexes:
+                cursor.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                    (migration.version, migration.description)
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.autocommit = True
+
+    if migration.indexes:
+        # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+        cursor = conn.cursor()
+        for name, definition in migration.indexes:
+            _build_index(cursor, name, definition)
+        cursor.execute(
+            "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+            (migration.version, migration.description)
+        )
+    print(f"✅ Migration {migration.version} ({migration.description}) applied in {time.monotonic() - started:.1f}s")
+
+
+def migrate() -> int:
+    """Bring the schema up to LATEST_VERSION; returns the resulting version."""
+    with db.read() as cursor:
+        version = current_version(cursor)
+        if version >= LATEST_VERSION:
+            print(f"✅ Database schema is current (version {version})")
+            return version
+
+        conn = cursor.connection
+        # Poll rather than block in pg_advisory_lock(): a blocked statement holds
+        # a snapshot, and CREATE INDEX CONCURRENTLY in the migrating process
+        # waits for every older snapshot to go away, so the two would deadlock
+        waiting = False
+        while True:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+            if cursor.fetchone()[0]:
+                break
+            if not waiting:
+                print("Another process is migrating the database, waiting for it...")
+                waiting = True
+            time.sleep(MIGRATION_POLL_INTERVAL)
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            # Re-read under the lock: whoever held it may have done the work already
+            version = current_version(cursor)
+            for migration in MIGRATIONS:
+                if migration.version > version:
+                    _apply(conn, migration)
+                    version = migration.version
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+    print(f"✅ Database schema migrated to version {version}")
+    return version
+
+
+if __name__ == "__main__":
+    migrate()
+    # Check the routes' SQL against the new schema as startup would; importing
+    # the routers registers their statements
+    import routers.agendas, routers.articles, routers.auth  # noqa: E401,F401
+    from queries import check_queries
+    check_queries()
+    db.close_db_pool()
@@ -70,6 +70,16 @@ class Agenda(BaseModel):
     owner_name: Optional[str] = None
     analysisResult: Optional[AnalysisResult] = None
 
+class AnalysisJob(BaseModel):
+    """Model for a background analysis job (queued, running, done or failed)"""
+    job_id: str
+    agenda_id: Optional[int] = None
+    status: str
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
 # ============================================
 # ARTICLE MODELS
 # ============================================
@@ -0,0 +1,51 @@
+"""
+Keyset (cursor) pagination helpers for listings ordered by (created_at DESC, id DESC).
+
+The cursor is an opaque, URL-safe token encoding the sort key of the last
+row on the previous page. The next cursor is returned in the X-Next-Cursor
+response header so list bodies keep their plain-array shape.
+"""
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode("utf-8").split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_params(cursor: Optional[str], limit: Optional[int]) -> Tuple[Optional[datetime], Optional[int], Optional[int]]:
+    """
+    Resolve request params into (after_created_at, after_id, fetch_limit).
+    fetch_limit is one more than the page size so a next page can be detected;
+    None means unpaginated (the legacy behaviour).
+    """
+    after_created_at, after_id = decode_cursor(cursor) if cursor else (None, None)
+    if limit is None:
+        return after_created_at, after_id, None
+    return after_created_at, after_id, min(max(limit, 1), MAX_PAGE_SIZE) + 1
+
+
+def trim_page(rows: list, fetch_limit: Optional[int], response: Response, created_at_index: int, id_index: int) -> list:
+    """Drop the look-ahead row and, if there was one, set the next-page cursor header."""
+    if fetch_limit is None or len(rows) < fetch_limit:
+        return rows
+    rows = rows[:fetch_limit - 1]
+    last = rows[-1]
+    response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last[created_at_index], last[id_index])
+    return rows
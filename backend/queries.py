@@ -0,0 +1,139 @@
+"""
+Registry of the SQL statements the routes run, addressed by name.
+
+Statements are registered at import time with register() and executed with
+run(cursor, query, params). Prepared queries are sent to Postgres once per
+connection as `PREPARE name AS ...` and afterwards only as `EXECUTE name
+(...)`, so the server skips parsing and, once it settles on a generic plan,
+planning too. Every query records its call count and latency for /health/db.
+check_queries() PREPAREs every registered statement at startup, so SQL that
+no longer matches the schema fails the deploy rather than the first request.
+"""
+import re
+import threading
+import time
+from typing import Dict, List, Sequence
+
+from psycopg2 import errors
+
+import database as db
+from config import DB_PREPARED_STATEMENTS
+
+_NAME = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+class Query:
+    """A named SQL statement with %s placeholders, plus its usage metrics."""
+
+    def __init__(self, name: str, sql: str, prepare: bool = True):
+        self.name = name
+        self.sql = sql
+        self.prepare = prepare
+        # Server-side form: %s placeholders become $1, $2, ...
+        counter = iter(range(1, sql.count("%s") + 1))
+        self.server_sql = re.sub(r"%s", lambda _: f"${next(counter)}", sql)
+        self.params = sql.count("%s")
+        self.execute_sql = f"EXECUTE {name}" + (f" ({', '.join(['%s'] * self.params)})" if self.params else "")
+        self.calls = 0
+        self.errors = 0
+        self.prepares = 0
+        self.latency = db.Histogram()
+        self._lock = threading.Lock()
+
+    def record(self, ms: float, failed: bool = False, prepared: bool = False):
+        with self._lock:
+            self.calls += 1
+            self.errors += failed
+            self.prepares += prepared
+            self.latency.observe(ms)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "prepares": self.prepares,
+                "prepared": self.prepare and DB_PREPARED_STATEMENTS,
+                "latency_ms": self.latency.snapshot(),
+            }
+
+
+_registry: Dict[str, Query] = {}
+
+
+def register(name: str, sql: str, prepare: bool = True) -> Query:
+    """
+    Add a statement to the registry. Pass prepare=False for statements that
+    run too rarely to be worth a PREPARE on every pooled connection.
+    """
+    if not _NAME.match(name):
+        raise ValueError(f"Invalid query name: {name!r}")
+    if name in _registry:
+        raise ValueError(f"Query {name!r} is already registered")
+    query = Query(name, sql, prepare)
+    _registry[name] = query
+    return query
+
+
+def _prepared_set(cursor):
+    """The connection's set of PREPAREd names, or None if it can't hold any."""
+    if not DB_PREPARED_STATEMENTS:
+        return None
+    return getattr(cursor.connection, "prepared", None)
+
+
+def run(cursor, query: Query, params: Sequence = ()):
+    """Execute `query` on `cursor`, PREPAREing it first if this connection hasn't yet."""
+    started = time.monotonic()
+    prepared = _prepared_set(cursor) if query.prepare else None
+    prepared_now = False
+    try:
+        if prepared is None:
+            cursor.execute(query.sql, params)
+        else:
+            if query.name not in prepared:
+                cursor.execute(f"PREPARE {query.name} AS {query.server_sql}")
+                prepared.add(query.name)
+                prepared_now = True
+            try:
+                cursor.execute(query.execute_sql, params)
+            except errors.InvalidSqlStatementName:
+                # The session lost it (e.g. DISCARD ALL); PREPARE again next time
+                prepared.discard(query.name)
+                raise
+    except Exception:
+        query.record((time.monotonic() - started) * 1000, failed=True, prepared=prepared_now)
+        raise
+    query.record((time.monotonic() - started) * 1000, prepared=prepared_now)
+
+
+def check_queries() -> None:
+    """
+    PREPARE every registered statement once, which makes Postgres parse,
+    resolve and type-check it against the live schema. Prepared queries stay
+    prepared on that connection; the others are deallocated again. Raises
+    RuntimeError listing every statement that failed.
+    """
+    failures: List[str] = []
+    with db.read() as cursor:
+        prepared = _prepared_set(cursor)
+        for query in _registry.values():
+            if prepared is not None and query.name in prepared:
+                continue
+            try:
+                cursor.execute(f"PREPARE {query.name} AS {query.server_sql}")
+            except Exception as e:
+                failures.append(f"{query.name}: {str(e).strip()}")
+                continue
+            if query.prepare and prepared is not None:
+                prepared.add(query.name)
+            else:
+                cursor.execute(f"DEALLOCATE {query.name}")
+    if failures:
+        raise RuntimeError("Invalid SQL in query registry:\n  " + "\n  ".join(failures))
+    print(f"✅ {len(_registry)} registered queries checked")
+
+
+def query_stats() -> dict:
+    """Per-query call counts, PREPAREs and latency histograms for /health/db."""
+    return {name: query.stats() for name, query in sorted(_registry.items())}
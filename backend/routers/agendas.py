@@ -1,63 +1,40 @@
 """
 Agenda CRUD routes for creating, reading, updating, and deleting agendas.
 """
+import asyncio
 import uuid
-from typing import List, Optional
+import hashlib
+from typing import List, Optional, Tuple
 import time
 import random
-import os
 try:
     from urllib.parse import urlparse
 except ImportError:
     from urlparse import urlparse
 
 from pydantic import BaseModel
-from fastapi import APIRouter, HTTPException, Depends, status
-from database import get_db_connection
-from models import User, Agenda, CreateAgenda, Article, AnalysisResult
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from psycopg2.extras import Json
+import database as db
+import queries
+from models import User, Agenda, CreateAgenda, Article, AnalysisResult, AnalysisJob
 from security import get_current_user
-import requests
-from bs4 import BeautifulSoup
+from scraper import fetch_article_excerpts
+from executors import analysis_executor, run_analysis, shard_executor
+from llm import complete_json, stream_json
+from evidence_packer import estimate_tokens, fit_context, output_tokens_for, pack_evidence
+from config import EXCERPT_CACHE_MAX_WORDS, LLM_MAP_REDUCE, LLM_SHARD_SIZE, LLM_SUMMARY_TOKENS, SHARED_ANALYSIS_RETRY_AFTER
+from jobs import FAILED, Job, analysis_jobs, wait_for_job
+from audit_cache import get_cached_audits, store_audits
+from pagination import MAX_PAGE_SIZE, keyset_params, trim_page
+from cache import LRUCache, SingleFlight
 import json
-from groq import Groq, GroqError
 
 router = APIRouter()
 
-def fetch_article_excerpt(url: str, max_words: int = 200) -> str:
-    """
-    Fetches the URL and extracts text from the first few paragraphs.
-    """
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        # Short timeout to not stall the request too long
-        response = requests.get(url, headers=headers, timeout=4)
-        if response.status_code != 200:
-            return ""
-            
-        soup = BeautifulSoup(response.content, 'lxml')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header", "aside"]):
-            script.decompose()
-            
-        # Get text
-        text = soup.get_text()
-        
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        # Truncate
-        words = text.split()
-        if len(words) > max_words:
-            return ' '.join(words[:max_words]) + "..."
-        return text
-    except Exception as e:
-        return ""
-
 ANALYSIS_SYSTEM_PROMPT = """You are a strict fact-checking analyst.
         Your ONLY job is to verify if the *actual content* of the provided articles supports the user's claim.
 
@@ -90,6 +67,51 @@ def _domain_of(url: str) -> str:
     except Exception:
         return 'unknown'
 
+def build_evidence(articles: list, fallback_to_description: bool = False, on_event=None) -> list:
+    """
+    Turn (title, url, description) rows into LLM evidence items.
+    Excerpts are fetched concurrently; with `fallback_to_description`, an
+    article whose page couldn't be scraped uses its stored description instead.
+    `on_event("evidence", ...)` reports each article as its page settles.
+    """
+    on_fetched = None
+    if on_event:
+        ids_by_url = {}
+        for i, a in enumerate(articles):
+            ids_by_url.setdefault(a[1], []).append(i)
+
+        def on_fetched(url, excerpt):
+            for i in ids_by_url.get(url, []):
+                on_event("evidence", {"id": f"a{i}", "title": articles[i][0], "url": url, "fetched": bool(excerpt)})
+
+    # Full cached excerpts; evidence_packer trims them to the prompt budget
+    excerpts = fetch_article_excerpts([a[1] for a in articles], max_words=EXCERPT_CACHE_MAX_WORDS, on_fetched=on_fetched)
+    evidence = []
+    for i, (a, excerpt) in enumerate(zip(articles, excerpts)):
+        title, url, description = a
+        if not excerpt and fallback_to_description:
+            excerpt = description
+        evidence.append({
+            "id": f"a{i}",
+            "title": title,
+            "url": url,
+            "publisher": urlparse(url).netloc if url else "Unknown",
+            "excerpt": excerpt
+        })
+    return evidence
+
+def evidence_fingerprint(claim: str, evidence: list) -> str:
+    """
+    Hash of the claim plus every (url, excerpt hash) pair, order-independent.
+    A cached analysis is fresh only while this matches the stored fingerprint.
+    """
+    items = sorted(
+        (e.get("url") or "", hashlib.sha256((e.get("excerpt") or "").encode("utf-8")).hexdigest())
+        for e in evidence
+    )
+    payload = json.dumps({"claim": claim.strip(), "evidence": items}, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
 def compute_numeric_score(article_scores: list, evidence: list) -> int:
     """
     Aggregate per-article LLM support scores into a single 0-100 credibility score.
@@ -127,31 +149,41 @@ def score_band(numeric_score: int) -> str:
         return "Medium"
     return "Low"
 
-def postprocess_llm_result(claim: str, evidence: list, parsed: dict) -> dict:
+def to_article_score(audit: dict, title_by_id: dict) -> dict:
+    """Raw LLM audit -> ArticleScore shape, with the support score clamped to 0-100."""
+    try:
+        raw_score = float(audit.get("support_score", 0))
+    except (TypeError, ValueError):
+        raw_score = 0.0
+    return {
+        "id": audit.get("id"),
+        "title": title_by_id.get(audit.get("id"), ""),
+        "topic": audit.get("detected_topic", ""),
+        "verdict": audit.get("verdict", "Unknown"),
+        "score": max(0, min(100, round(raw_score))),
+    }
+
+def postprocess_llm_result(claim: str, evidence: list, parsed: dict, cached_audits: Optional[dict] = None) -> dict:
     """
     Turn the raw LLM JSON into the API result: extract per-article scores,
     aggregate them deterministically (never trust LLM arithmetic), and derive
     the word score from the numeric one so badge and number always agree.
+
+    `cached_audits` (evidence id -> audit) are merged in for articles that
+    weren't sent to the model this time, so the aggregate always covers
+    the whole agenda.
     """
+    cached_audits = cached_audits or {}
     reasoning = parsed.get("reasoning", "Analysis failed.")
-    audits = parsed.get("article_audits", []) or []
+    audits = [
+        a for a in (parsed.get("article_audits", []) or [])
+        if not (isinstance(a, dict) and a.get("id") in cached_audits)
+    ] + list(cached_audits.values())
     title_by_id = {e["id"]: e.get("title", "") for e in evidence}
+    order = {e["id"]: i for i, e in enumerate(evidence)}
 
-    article_scores = []
-    for a in audits:
-        if not isinstance(a, dict):
-            continue
-        try:
-            raw_score = float(a.get("support_score", 0))
-        except (TypeError, ValueError):
-            raw_score = 0.0
-        article_scores.append({
-            "id": a.get("id"),
-            "title": title_by_id.get(a.get("id"), ""),
-            "topic": a.get("detected_topic", ""),
-            "verdict": a.get("verdict", "Unknown"),
-            "score": max(0, min(100, round(raw_score))),
-        })
+    article_scores = [to_article_score(a, title_by_id) for a in audits if isinstance(a, dict)]
+    article_scores.sort(key=lambda a: order.get(a["id"], len(order)))
 
     if article_scores:
         numeric_score = compute_numeric_score(article_scores, evidence)
@@ -174,221 +206,295 @@ def postprocess_llm_result(claim: str, evidence: list, parsed: dict) -> dict:
         "claim": claim
     }
 
-def call_openrouter_analysis(claim: str, evidence: list) -> Optional[dict]:
-    """
-    Calls OpenRouter LLM to analyze the claim based on evidence.
-    """
-    api_key = os.getenv("OPENROUTER_API_KEY")
-    model = os.getenv("OPENROUTER_MODEL", "openai/gpt-oss-20b:free")
-    print(f"DEBUG: Checking for API Key... Found? {bool(api_key)}")
-    if not api_key:
-        print("DEBUG: No API Key found, skipping LLM.")
-        return None
+def summarize_cached_audits(cached_audits: dict) -> str:
+    """Deterministic reasoning for a re-analysis where every article was already audited."""
+    audits = list(cached_audits.values())
+    relevant = [a for a in audits if (a.get("support_score") or 0) >= 40]
+    rejected = [a for a in audits if (a.get("support_score") or 0) < 40]
+    reasoning = (
+        f"All {len(audits)} sources were already audited against this claim and none changed since. "
+        f"{len(relevant)} of {len(audits)} substantively support it."
+    )
+    if rejected:
+        reasoning += " Rejected as weak or irrelevant: " + "; ".join(
+            f"{a['id']} ({a.get('detected_topic') or 'Unknown topic'})" for a in rejected
+        ) + "."
+    return reasoning
+
+SUMMARY_SYSTEM_PROMPT = """You are a strict fact-checking analyst writing the final verdict.
+        Every article has already been audited and the overall credibility score computed; do NOT re-score anything.
+        Using only the audits provided, explain in 3-5 sentences why the evidence does or does not support the claim.
+        Explicitly mention the rejected (low-scoring) articles.
 
-    print(f"DEBUG: Calling OpenRouter model '{model}' with {len(evidence)} evidence items...")
-    # DEBUG: Print the evidence being sent to checking for empty/malformed content
-    for item in evidence:
-        print(f"DEBUG EVIDENCE ITEM {item['id']}: URL={item['url']} CONTENT_PREVIEW={item['excerpt'][:100]}...")
+        Output Format (JSON):
+        { "reasoning": "..." }
+        """
 
-    messages = [
-      {
-        "role": "system",
-        "content": ANALYSIS_SYSTEM_PROMPT
-      },
-      {
-        "role": "user",
-        "content": json.dumps({
-          "task": "Evaluate whether the provided evidence supports the agenda claim.",
-          "agenda_claim": claim,
-          "evidence_items": evidence,
-          "instructions": {
+def build_analysis_messages(
+    claim: str,
+    evidence: list,
+    previously_audited: Optional[list] = None,
+    audits_only: bool = False,
+) -> list:
+    """
+    Chat messages shared by every LLM provider.
+    `audits_only` is used for map-reduce shards: the model scores its articles
+    and the overall reasoning is written afterwards by the summary call.
+    """
+    payload = {
+        "task": "Evaluate whether the provided evidence supports the agenda claim.",
+        "agenda_claim": claim,
+        "evidence_items": evidence,
+        "instructions": {
             "evaluate_source_credibility": True,
             "evaluate_relevance_to_claim": True,
             "identify_missing_information": True,
             "score_each_article_individually": True,
             "return_confidence_level": ["Low", "Medium", "High"]
-          }
-        }, ensure_ascii=False)
-      }
-    ]
-
-    try:
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "http://localhost:3000", 
-                "X-Title": "Agenda App"
-            },
-            json={
-                "model": model,
-                "messages": messages
-            },
-            timeout=45
+        }
+    }
+    if audits_only:
+        payload["instructions"]["audits_only"] = (
+            "These articles are one shard of a larger set. Focus on article_audits; "
+            "keep reasoning to one sentence, the overall judgment is made separately."
         )
-        
-        if response.status_code == 200:
-            result = response.json()
-            content = result['choices'][0]['message']['content'].strip()
-            print(f"DEBUG OPENROUTER RAW CONTENT: {content}")
-            # Clean content if it has markdown code blocks
-            if "```json" in content:
-                content = content.replace("```json", "").replace("```", "")
-            elif "```" in content:
-                content = content.replace("```", "")
-            
-            start_idx = content.find('{')
-            end_idx = content.rfind('}')
-            if start_idx != -1 and end_idx != -1:
-                content = content[start_idx:end_idx+1]
-            
-            parsed = json.loads(content)
-            return postprocess_llm_result(claim, evidence, parsed)
-        else:
-            print(f"LLM API Error: {response.status_code} - {response.text}")
-            return None
-    except Exception as e:
-        print(f"LLM Exception: {str(e)}")
-        return None
-
-def call_groq_analysis(claim: str, evidence: list) -> Optional[dict]:
-    """
-    Calls Groq LLM to analyze the claim based on evidence.
-    """
-    api_key = os.getenv("GROQ_API_KEY")
-    model = os.getenv("GROQ_LLAMA_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct")
-    print(f"DEBUG: Checking for Groq API Key... Found? {bool(api_key)}")
-    if not api_key:
-        print("DEBUG: No Groq API Key found, skipping Groq.")
-        return None
-
-    try:
-        client = Groq(api_key=api_key)
-    except Exception as e:
-        print(f"DEBUG: Error initializing Groq client: {e}")
-        return None
-
-    print(f"DEBUG: Calling Groq model '{model}' with {len(evidence)} evidence items...")
-    for item in evidence:
-        print(f"DEBUG GROQ EVIDENCE ITEM {item['id']}: URL={item['url']} CONTENT_PREVIEW={item['excerpt'][:100]}...")
-
-    messages = [
+    if previously_audited:
+        payload["previously_audited_items"] = previously_audited
+        payload["instructions"]["previously_audited_items"] = (
+            "Already scored in an earlier run. Do NOT return audits for them, "
+            "but take them into account in the overall score and reasoning."
+        )
+    return [
       {
         "role": "system",
         "content": ANALYSIS_SYSTEM_PROMPT
       },
       {
         "role": "user",
-        "content": json.dumps({
-          "task": "Evaluate whether the provided evidence supports the agenda claim.",
-          "agenda_claim": claim,
-          "evidence_items": evidence,
-          "instructions": {
-            "evaluate_source_credibility": True,
-            "evaluate_relevance_to_claim": True,
-            "identify_missing_information": True,
-            "score_each_article_individually": True,
-            "return_confidence_level": ["Low", "Medium", "High"]
-          }
-        }, ensure_ascii=False)
+        "content": json.dumps(payload, ensure_ascii=False)
       }
     ]
 
-    try:
-        chat_completion = client.chat.completions.create(
-            messages=messages,
-            model=model,
-            temperature=0.3,
-            max_tokens=2048,
-            response_format={"type": "json_object"}
+def build_summary_messages(claim: str, result: dict) -> list:
+    """Messages for the reduce step: the scored audits in, a short reasoning out."""
+    payload = {
+        "agenda_claim": claim,
+        "credibility_score": result["numeric_score"],
+        "confidence_level": result["score"],
+        "article_audits": [
+            {k: a.get(k) for k in ("id", "title", "topic", "verdict", "score")}
+            for a in result["article_scores"] or []
+        ],
+    }
+    return [
+        {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+        {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
+    ]
+
+def request_analysis(messages: list, max_tokens: int, on_audit=None) -> Optional[dict]:
+    """One LLM analysis call; with `on_audit` the reply is streamed and each audit reported as it's parsed."""
+    if on_audit is None:
+        return complete_json(messages, max_tokens=max_tokens)
+    return stream_json(messages, on_audit, max_tokens=max_tokens)
+
+def run_shards(claim: str, shards: List[list], on_audit=None) -> List[Optional[dict]]:
+    """Map step: audit every shard in parallel; replies come back in shard order (None on failure)."""
+    futures = [
+        shard_executor.submit(
+            request_analysis,
+            build_analysis_messages(claim, shard, audits_only=True),
+            output_tokens_for(len(shard)),
+            on_audit
         )
-        
-        content = chat_completion.choices[0].message.content.strip()
-        print(f"DEBUG GROQ RAW CONTENT: {content}")
-        # Clean content if it has markdown code blocks
-        if "```json" in content:
-            content = content.replace("```json", "").replace("```", "")
-        elif "```" in content:
-            content = content.replace("```", "")
-        
-        start_idx = content.find('{')
-        end_idx = content.rfind('}')
-        if start_idx != -1 and end_idx != -1:
-            content = content[start_idx:end_idx+1]
-        
-        parsed = json.loads(content)
-        return postprocess_llm_result(claim, evidence, parsed)
-    except GroqError as e:
-        print(f"DEBUG: Groq API Error - {e}")
-        return None
-    except Exception as e:
-        print(f"DEBUG: Groq Exception: {str(e)}")
-        return None
+        for shard in shards
+    ]
+    return [f.result() for f in futures]
+
+def merge_llm_replies(replies: List[dict]) -> dict:
+    """Combine the replies of a chunked analysis into one reply for postprocess_llm_result."""
+    if len(replies) == 1:
+        return replies[0]
+    return {
+        "article_audits": [
+            a for r in replies for a in (r.get("article_audits") or []) if isinstance(a, dict)
+        ],
+        "score": replies[0].get("score", "Low") if replies else "Low",
+        "reasoning": "\n\n".join(r["reasoning"] for r in replies if r.get("reasoning")) or "Analysis failed.",
+    }
 
-def call_llm_analysis(claim: str, evidence: list) -> Optional[dict]:
+def call_llm_analysis(claim: str, evidence: list, on_event=None, force_refresh: bool = False) -> Optional[dict]:
     """
     Main entry point for LLM analysis.
-    First attempts to use Groq as the primary framework.
-    If the call to Groq fails for any reason, falls back to OpenRouter.
+    Providers are tried in LLM_PROVIDERS order (Groq, then OpenRouter by
+    default); see llm.complete_json for circuit breaking and hedging.
+
+    Per-article audits are cached per (claim, article URL): only new or
+    changed articles are sent to the model, and cached scores are merged
+    back in before aggregation. A `force_refresh` with nothing new or changed
+    re-audits every article instead of restating the cached scores.
+
+    Pending articles are packed into token-budgeted chunks; the chunks'
+    audits are merged before scoring. Past LLM_SHARD_SIZE pending articles
+    this becomes map-reduce: small shards are audited in parallel, scores
+    are reduced with compute_numeric_score, and one short summary call
+    writes the reasoning.
+
+    With `on_event`, every per-article score is reported as an "audit" event
+    as soon as it's known (cached ones first, then as the model streams).
     """
-    print("DEBUG: Attempting primary LLM call using Groq...")
-    result = call_groq_analysis(claim, evidence)
-    if result is not None:
-        return result
-    
-    print("DEBUG: Primary LLM call with Groq failed or unavailable. Falling back to secondary OpenRouter...")
-    return call_openrouter_analysis(claim, evidence)
+    cached_audits = get_cached_audits(claim, evidence)
+    pending = [e for e in evidence if e["id"] not in cached_audits]
+    if force_refresh and not pending:
+        # An explicit re-analysis (e.g. after deleting an article) must not
+        # replace the model's reasoning with the canned cached-audit summary
+        cached_audits = {}
+        pending = list(evidence)
+    print(f"DEBUG: {len(cached_audits)} cached audits, {len(pending)} of {len(evidence)} evidence items to audit")
+
+    title_by_id = {e["id"]: e.get("title", "") for e in evidence}
+    on_audit = None
+    if on_event:
+        for audit in cached_audits.values():
+            on_event("audit", dict(to_article_score(audit, title_by_id), cached=True))
+
+        def on_audit(audit):
+            if audit.get("id") in title_by_id:
+                on_event("audit", dict(to_article_score(audit, title_by_id), cached=False))
+
+    if evidence and not pending:
+        parsed = {"article_audits": [], "reasoning": summarize_cached_audits(cached_audits)}
+        return postprocess_llm_result(claim, evidence, parsed, cached_audits)
+
+    for item in pending:
+        print(f"DEBUG EVIDENCE ITEM {item['id']}: URL={item['url']} CONTENT_PREVIEW={(item['excerpt'] or '')[:100]}...")
+    if on_event:
+        on_event("phase", {"phase": "auditing", "pending": len(pending), "cached": len(cached_audits)})
+    map_reduce = LLM_MAP_REDUCE and len(pending) > LLM_SHARD_SIZE
+    if map_reduce:
+        # Shards only audit; previously audited items matter for the summary, not here
+        previously_audited = None
+        base_messages = build_analysis_messages(claim, [], audits_only=True)
+    else:
+        # However many articles were audited before, the new ones keep room for their excerpts
+        previously_audited = fit_context(
+            list(cached_audits.values()),
+            pending,
+            sum(estimate_tokens(m["content"]) for m in build_analysis_messages(claim, [])),
+            min_items=min(len(pending), LLM_SHARD_SIZE)
+        )
+        base_messages = build_analysis_messages(claim, [], previously_audited)
+    fixed_tokens = sum(estimate_tokens(m["content"]) for m in base_messages)
+    chunks = pack_evidence(pending, fixed_tokens, max_items=LLM_SHARD_SIZE if map_reduce else None) or [[]]
+    print(f"DEBUG: {len(pending)} evidence items packed into {len(chunks)} LLM call(s)"
+          f"{' (map-reduce)' if map_reduce else ''}")
+
+    if map_reduce:
+        replies = [r for r in run_shards(claim, chunks, on_audit) if r is not None]
+    else:
+        replies = []
+        for chunk in chunks:
+            parsed = request_analysis(
+                build_analysis_messages(claim, chunk, previously_audited),
+                output_tokens_for(len(chunk)),
+                on_audit
+            )
+            if parsed is None:
+                break
+            replies.append(parsed)
+
+    merged = merge_llm_replies(replies)
+    result = postprocess_llm_result(claim, evidence, merged, cached_audits)
+    # Keep what did come back so a retry only re-sends the failed chunks
+    store_audits(claim, evidence, [a for a in result["article_scores"] or [] if a["id"] not in cached_audits])
+    if len(replies) < len(chunks):
+        return None
+
+    if map_reduce:
+        # Reduce: the score is already computed deterministically, the model only explains it
+        if on_event:
+            on_event("phase", {"phase": "summarizing", "numeric_score": result["numeric_score"]})
+        summary = complete_json(build_summary_messages(claim, result), max_tokens=LLM_SUMMARY_TOKENS)
+        if summary and summary.get("reasoning"):
+            result["reasoning"] = summary["reasoning"]
+    return result
+
+_INSERT_AGENDA = queries.register(
+    "agenda_insert",
+    "INSERT INTO agendas (user_id, title) VALUES (%s, %s) RETURNING id, user_id, title, created_at, share_token"
+)
+
 
 @router.post("", response_model=Agenda, status_code=status.HTTP_201_CREATED)
-async def create_agenda(
+def create_agenda(
     agenda: CreateAgenda,
     current_user: User = Depends(get_current_user)
 ):
     """
     Create a new agenda for the authenticated user.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "INSERT INTO agendas (user_id, title) VALUES (%s, %s) RETURNING id, user_id, title, created_at, share_token",
-            (current_user.id, agenda.title)
-        )
+    with db.transaction() as cursor:
+        queries.run(cursor, _INSERT_AGENDA, (current_user.id, agenda.title))
         row = cursor.fetchone()
-        conn.commit()
-        # Handle potential older DB schema without share_token column (though migration should help)
-        share_token = row[4] if len(row) > 4 else None
-        return Agenda(id=row[0], user_id=row[1], title=row[2], createdAt=row[3], share_token=share_token)
-    finally:
-        conn.close()
+        return Agenda(id=row[0], user_id=row[1], title=row[2], createdAt=row[3], share_token=row[4])
 
 
-@router.get("", response_model=List[Agenda])
-async def get_agendas(current_user: User = Depends(get_current_user)):
+def _analysis_is_stale(agenda: str) -> str:
     """
-    Get all agendas for the authenticated user.
+    SQL for "the cached analysis no longer matches", without re-fetching any
+    article: it has no fingerprint (simulated fallback, or the agenda was
+    renamed since), or articles were added or deleted since it ran.
+    `agenda` is the agendas table name or alias in the enclosing query.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        # Try to select with share_token
-        try:
-            cursor.execute(
-                "SELECT id, user_id, title, created_at, share_token, analysis_score, analysis_reasoning, analysis_article_count, analysis_numeric_score FROM agendas WHERE user_id = %s ORDER BY created_at DESC",
-                (current_user.id,)
-            )
-        except Exception:
-            conn.rollback()
-            # Fallback for old schema if migration failed
-            cursor.execute(
-                "SELECT id, user_id, title, created_at FROM agendas WHERE user_id = %s ORDER BY created_at DESC",
-                (current_user.id,)
-            )
-            rows = cursor.fetchall()
-            return [Agenda(id=r[0], user_id=r[1], title=r[2], createdAt=r[3]) for r in rows]
+    return f"""({agenda}.analysis_fingerprint IS NULL
+               OR {agenda}.analysis_article_count IS DISTINCT FROM
+                  (SELECT count(*) FROM articles ar WHERE ar.agenda_id = {agenda}.id)
+               OR EXISTS (SELECT 1 FROM articles ar
+                          WHERE ar.agenda_id = {agenda}.id AND ar.created_at > {agenda}.last_analyzed_at))"""
+
+
+def _list_agendas_sql(summary: bool, after: bool) -> str:
+    return f"""SELECT id, user_id, title, created_at, share_token, analysis_score,
+                      {"NULL" if summary else "analysis_reasoning"}, analysis_article_count, analysis_numeric_score,
+                      {"NULL" if summary else "analysis_article_scores"}, {_analysis_is_stale("agendas")}
+               FROM agendas
+               WHERE user_id = %s
+               {"AND (created_at, id) < (%s, %s)" if after else ""}
+               ORDER BY created_at DESC, id DESC
+               LIMIT %s"""
+
+
+# One statement per (summary, cursor) combination so each can be prepared
+_LIST_AGENDAS = {
+    (summary, after): queries.register(
+        f"agendas_list{'_summary' if summary else ''}{'_after' if after else ''}",
+        _list_agendas_sql(summary, after)
+    )
+    for summary in (False, True)
+    for after in (False, True)
+}
+
 
-        rows = cursor.fetchall()
+@router.get("", response_model=List[Agenda])
+def get_agendas(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit to get every agenda"),
+    after: Optional[str] = Query(None, alias="cursor", description="X-Next-Cursor value from the previous page"),
+    summary: bool = Query(False, description="Leave out analysis reasoning and per-article scores"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get all agendas for the authenticated user, newest first.
+    Pass `limit` to page through them; the next page's cursor is returned
+    in the X-Next-Cursor header.
+    """
+    after_created_at, after_id, fetch_limit = keyset_params(after, limit)
+    with db.read() as cursor:
+        queries.run(
+            cursor,
+            _LIST_AGENDAS[(summary, bool(after))],
+            (current_user.id, *((after_created_at, after_id) if after else ()), fetch_limit)
+        )
+        rows = trim_page(cursor.fetchall(), fetch_limit, response, created_at_index=3, id_index=0)
         return [
             Agenda(
                 id=r[0],
@@ -402,8 +508,9 @@ async def get_agendas(current_user: User = Depends(get_current_user)):
                         reasoning=r[6] or "",
                         claim=r[2],
                         numeric_score=r[8],
+                        article_scores=r[9],
                         is_cached=True,
-                        is_stale=False,
+                        is_stale=r[10],
                         articleCount=r[7]
                     )
                     if r[5]
@@ -412,27 +519,25 @@ async def get_agendas(current_user: User = Depends(get_current_user)):
             )
             for r in rows
         ]
-    finally:
-        conn.close()
+
+
+_SHARED_AGENDA = queries.register(
+    "shared_agenda",
+    f"""SELECT a.id, a.user_id, a.title, a.created_at, a.share_token, u.name, a.analysis_score, a.analysis_reasoning, a.analysis_article_count, a.analysis_numeric_score, a.analysis_article_scores,
+              {_analysis_is_stale("a")}
+       FROM agendas a
+       JOIN users u ON a.user_id = u.id
+       WHERE a.share_token = %s"""
+)
 
 
 @router.get("/shared/{token}", response_model=Agenda)
-async def get_shared_agenda(token: str):
+def get_shared_agenda(token: str):
     """
     Get a shared agenda by token (Public access).
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            """
-            SELECT a.id, a.user_id, a.title, a.created_at, a.share_token, u.name, a.analysis_score, a.analysis_reasoning, a.analysis_article_count, a.analysis_numeric_score
-            FROM agendas a
-            JOIN users u ON a.user_id = u.id
-            WHERE a.share_token = %s
-            """,
-            (token,)
-        )
+    with db.read() as cursor:
+        queries.run(cursor, _SHARED_AGENDA, (token,))
         row = cursor.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Agenda not found")
@@ -450,37 +555,38 @@ async def get_shared_agenda(token: str):
                     reasoning=row[7] or "",
                     claim=row[2],
                     numeric_score=row[9],
+                    article_scores=row[10],
                     is_cached=True,
-                    is_stale=False,
+                    is_stale=row[11],
                     articleCount=row[8]
                 )
                 if row[6]
                 else None
             )
         )
-    finally:
-        conn.close()
+
+
+_SHARED_AGENDA_ID = queries.register("shared_agenda_id", "SELECT id FROM agendas WHERE share_token = %s")
+_LIST_ARTICLES = queries.register(
+    "agenda_articles",
+    "SELECT id, title, url, description, image, agenda_id, created_at FROM articles WHERE agenda_id = %s ORDER BY created_at DESC"
+)
 
 
 @router.get("/shared/{token}/articles", response_model=List[Article])
-async def get_shared_agenda_articles(token: str):
+def get_shared_agenda_articles(token: str):
     """
     Get articles for a shared agenda (Public access).
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
+    with db.read() as cursor:
         # First resolve the token to an ID
-        cursor.execute("SELECT id FROM agendas WHERE share_token = %s", (token,))
+        queries.run(cursor, _SHARED_AGENDA_ID, (token,))
         row = cursor.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Agenda not found")
         agenda_id = row[0]
 
-        cursor.execute(
-            "SELECT id, title, url, description, image, agenda_id, created_at FROM articles WHERE agenda_id = %s ORDER BY created_at DESC",
-            (agenda_id,)
-        )
+        queries.run(cursor, _LIST_ARTICLES, (agenda_id,))
         articles = cursor.fetchall()
         return [
             Article(
@@ -494,38 +600,26 @@ async def get_shared_agenda_articles(token: str):
             ) 
             for a in articles
         ]
-    finally:
-        conn.close()
+
+
+_GET_AGENDA = queries.register(
+    "agenda_by_owner",
+    f"""SELECT id, user_id, title, created_at, share_token, analysis_score, analysis_reasoning, analysis_article_count, analysis_numeric_score, analysis_article_scores,
+               {_analysis_is_stale("agendas")}
+        FROM agendas WHERE id = %s AND user_id = %s"""
+)
 
 
 @router.get("/{agenda_id}", response_model=Agenda)
-async def get_agenda(
+def get_agenda(
     agenda_id: int,
     current_user: User = Depends(get_current_user)
 ):
     """
     Get a specific agenda by ID.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        # Try select with share_token
-        try:
-            cursor.execute(
-                "SELECT id, user_id, title, created_at, share_token, analysis_score, analysis_reasoning, analysis_article_count, analysis_numeric_score FROM agendas WHERE id = %s AND user_id = %s",
-                (agenda_id, current_user.id)
-            )
-        except Exception:
-            conn.rollback()
-            cursor.execute(
-                "SELECT id, user_id, title, created_at FROM agendas WHERE id = %s AND user_id = %s",
-                (agenda_id, current_user.id)
-            )
-            row = cursor.fetchone()
-            if not row:
-                raise HTTPException(status_code=404, detail="Agenda not found")
-            return Agenda(id=row[0], user_id=row[1], title=row[2], createdAt=row[3])
-
+    with db.read() as cursor:
+        queries.run(cursor, _GET_AGENDA, (agenda_id, current_user.id))
         row = cursor.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Agenda not found")
@@ -541,88 +635,82 @@ async def get_agenda(
                     reasoning=row[6] or "",
                     claim=row[2],
                     numeric_score=row[8],
+                    article_scores=row[9],
                     is_cached=True,
-                    is_stale=False,
+                    is_stale=row[10],
                     articleCount=row[7]
                 )
                 if row[5]
                 else None
             )
         )
-    finally:
-        conn.close()
+
+
+_SHARE_AGENDA = queries.register(
+    "agenda_share",
+    """UPDATE agendas SET share_token = COALESCE(share_token, %s)
+       WHERE id = %s AND user_id = %s
+       RETURNING id, user_id, title, created_at, share_token"""
+)
 
 
 @router.post("/{agenda_id}/share", response_model=Agenda)
-async def share_agenda(
+def share_agenda(
     agenda_id: int,
     current_user: User = Depends(get_current_user)
 ):
     """
     Generate or retrieve a share token for an agenda.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        # Verify ownership
-        cursor.execute(
-            "SELECT id, user_id, title, created_at, share_token FROM agendas WHERE id = %s AND user_id = %s",
-            (agenda_id, current_user.id)
-        )
+    with db.transaction() as cursor:
+        # Ownership check and token assignment in one statement; an existing token is kept
+        queries.run(cursor, _SHARE_AGENDA, (str(uuid.uuid4()), agenda_id, current_user.id))
         row = cursor.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Agenda not found")
         
-        existing_token = row[4]
-        if existing_token:
-             return Agenda(id=row[0], user_id=row[1], title=row[2], createdAt=row[3], share_token=existing_token)
-
-        # Generate new token
-        new_token = str(uuid.uuid4())
-        cursor.execute(
-            "UPDATE agendas SET share_token = %s WHERE id = %s",
-            (new_token, agenda_id)
-        )
-        conn.commit()
-        
-        return Agenda(id=row[0], user_id=row[1], title=row[2], createdAt=row[3], share_token=new_token)
-    finally:
-        conn.close()
+        return Agenda(id=row[0], user_id=row[1], title=row[2], createdAt=row[3], share_token=row[4])
+
+
+_UNSHARE_AGENDA = queries.register(
+    "agenda_unshare",
+    """UPDATE agendas SET share_token = NULL
+       WHERE id = %s AND user_id = %s
+       RETURNING id, user_id, title, created_at"""
+)
 
 
 @router.post("/{agenda_id}/unshare", response_model=Agenda)
-async def unshare_agenda(
+def unshare_agenda(
     agenda_id: int,
     current_user: User = Depends(get_current_user)
 ):
     """
     Revoke the share token for an agenda.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        # Verify ownership
-        cursor.execute(
-            "SELECT id, user_id, title, created_at FROM agendas WHERE id = %s AND user_id = %s",
-            (agenda_id, current_user.id)
-        )
+    with db.transaction() as cursor:
+        queries.run(cursor, _UNSHARE_AGENDA, (agenda_id, current_user.id))
         row = cursor.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Agenda not found")
         
-        cursor.execute(
-            "UPDATE agendas SET share_token = NULL WHERE id = %s",
-            (agenda_id,)
-        )
-        conn.commit()
-        
         return Agenda(id=row[0], user_id=row[1], title=row[2], createdAt=row[3], share_token=None)
-    finally:
-        conn.close()
+
+
+# A cached analysis judged the old claim: a real title change drops its
+# fingerprint, which marks it stale and makes the shared endpoint recompute
+_RENAME_AGENDA = queries.register(
+    "agenda_rename",
+    """UPDATE agendas
+       SET analysis_fingerprint = CASE WHEN title IS DISTINCT FROM %s THEN NULL ELSE analysis_fingerprint END,
+           title = %s
+       WHERE id = %s AND user_id = %s
+       RETURNING id, user_id, title, created_at, share_token"""
+)
 
 
 @router.patch("/{agenda_id}", response_model=Agenda)
-async def update_agenda(
+def update_agenda(
     agenda_id: int,
     agenda_update: CreateAgenda, 
     current_user: User = Depends(get_current_user)
@@ -630,52 +718,30 @@ async def update_agenda(
     """
     Update an agenda title.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        # Verify ownership
-        cursor.execute(
-            "SELECT id FROM agendas WHERE id = %s AND user_id = %s",
-            (agenda_id, current_user.id)
-        )
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Agenda not found")
-        
-        cursor.execute(
-            "UPDATE agendas SET title = %s WHERE id = %s RETURNING id, user_id, title, created_at, share_token",
-            (agenda_update.title, agenda_id)
-        )
+    with db.transaction() as cursor:
+        queries.run(cursor, _RENAME_AGENDA, (agenda_update.title, agenda_update.title, agenda_id, current_user.id))
         row = cursor.fetchone()
-        conn.commit()
+        if not row:
+            raise HTTPException(status_code=404, detail="Agenda not found")
         return Agenda(id=row[0], user_id=row[1], title=row[2], createdAt=row[3], share_token=row[4])
-    finally:
-        conn.close()
+
+
+_DELETE_AGENDA = queries.register("agenda_delete", "DELETE FROM agendas WHERE id = %s AND user_id = %s")
 
 
 @router.delete("/{agenda_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_agenda(
+def delete_agenda(
     agenda_id: int,
     current_user: User = Depends(get_current_user)
 ):
     """
     Delete an agenda and all its articles.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        # Verify ownership
-        cursor.execute(
-            "SELECT id FROM agendas WHERE id = %s AND user_id = %s",
-            (agenda_id, current_user.id)
-        )
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Agenda not found")
-        
+    with db.transaction() as cursor:
         # Delete agenda (articles will cascade delete)
-        cursor.execute("DELETE FROM agendas WHERE id = %s", (agenda_id,))
-        conn.commit()
-    finally:
-        conn.close()
+        queries.run(cursor, _DELETE_AGENDA, (agenda_id, current_user.id))
+        if cursor.rowcount == 0:
+            raise HTTPException(status_code=404, detail="Agenda not found")
 
 # Define a model for raw analysis requests
 class RawArticleData(BaseModel):
@@ -693,27 +759,16 @@ async def analyze_raw_claim(request: RawAnalysisRequest):
     Analyze a claim using raw data provided in the request body.
     Useful for Demo Mode where data isn't in the DB.
     """
-    claim = request.claim
-    raw_articles = request.articles
-    
+    return await run_analysis(run_raw_analysis, request.claim, request.articles)
+
+
+def run_raw_analysis(claim: str, raw_articles: List[RawArticleData]) -> dict:
+    """Blocking body of analyze_raw_claim; runs on the analysis pool."""
     # Prepare evidence
-    evidence_items = []
-    for i, a in enumerate(raw_articles):
-        # Helper to fetch excerpt (reuse the existing mechanism by calling function if available or simulating)
-        # We need to make sure 'fetch_article_excerpt' is available in scope or moved up.
-        # Assuming it is available (it was used in previous function).
-        url = a.url
-        excerpt = fetch_article_excerpt(url) if url else None
-        if not excerpt:
-            excerpt = a.description
-        
-        evidence_items.append({
-            "id": f"a{i}",
-            "title": a.title,
-            "url": url,
-            "publisher": urlparse(url).netloc if url else "Unknown",
-            "excerpt": excerpt
-        })
+    evidence_items = build_evidence(
+        [(a.title, a.url, a.description) for a in raw_articles],
+        fallback_to_description=True
+    )
 
     # Try real LLM
     llm_result = call_llm_analysis(claim, evidence_items)
@@ -734,108 +789,147 @@ async def analyze_raw_claim(request: RawAnalysisRequest):
 async def analyze_shared_agenda_claim(share_token: str):
     """
     Analyze the agenda claim for a shared agenda (public access).
+
+    Cached results are read on the regular threadpool; only the one call per
+    agenda that has to compute a result takes an analysis pool thread, and
+    everyone else asking meanwhile awaits it without holding a thread.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        # 1. Fetch Agenda by Token
-        cursor.execute(
-            "SELECT id, title FROM agendas WHERE share_token = %s",
-            (share_token,)
-        )
+    agenda_id, claim, cached = await run_in_threadpool(load_shared_analysis, share_token)
+    if cached is not None:
+        return cached
+    future = _shared_analysis_flight.submit(agenda_id, analysis_executor, compute_shared_analysis, agenda_id, claim)
+    # Shielded so a visitor disconnecting doesn't cancel the shared computation
+    return await asyncio.shield(asyncio.wrap_future(future))
+
+
+# Public analyses: one computation per agenda at a time, shared by every
+# visitor who asks meanwhile, and a cooldown after a failed LLM run so
+# anonymous traffic can't keep paying for retries.
+_shared_analysis_flight = SingleFlight()
+_shared_llm_failures = LRUCache(maxsize=1024, ttl=SHARED_ANALYSIS_RETRY_AFTER)
+
+# A renamed agenda has no fingerprint and isn't served at all (see load_shared_analysis)
+_SHARED_ANALYSIS = queries.register(
+    "shared_agenda_analysis",
+    f"""SELECT a.id, a.title, a.analysis_score, a.analysis_reasoning, a.analysis_numeric_score,
+              a.analysis_article_scores, a.analysis_fingerprint, {_analysis_is_stale("a")}
+       FROM agendas a WHERE a.share_token = %s"""
+)
+_ANALYSIS_ARTICLES = queries.register(
+    "analysis_articles",
+    "SELECT title, url, description FROM articles WHERE agenda_id = %s"
+)
+
+
+def load_shared_analysis(share_token: str) -> Tuple[int, str, Optional[dict]]:
+    """
+    Look up a shared agenda and its persisted analysis (the same cache the
+    owner endpoint fills). Returns (agenda_id, claim, cached result or None).
+    Only real LLM results for the current title are served: simulated
+    fallbacks are stored without a fingerprint and a rename clears it, so
+    both are recomputed instead. Anonymous callers never force a
+    refresh, so a stale result is served with is_stale set.
+    """
+    with db.read() as cursor:
+        queries.run(cursor, _SHARED_ANALYSIS, (share_token,))
         agenda_row = cursor.fetchone()
-        if not agenda_row:
-            raise HTTPException(status_code=404, detail="Shared agenda not found")
-        
-        agenda_id = agenda_row[0]
-        claim = agenda_row[1]
-        
-        # 2. Fetch Articles
-        cursor.execute(
-            "SELECT title, url, description FROM articles WHERE agenda_id = %s",
-            (agenda_id,)
-        )
+    if not agenda_row:
+        raise HTTPException(status_code=404, detail="Shared agenda not found")
+
+    (agenda_id, claim, cached_score, cached_reasoning, cached_numeric,
+     cached_article_scores, cached_fingerprint, is_stale) = agenda_row
+    if cached_score and cached_reasoning and cached_fingerprint:
+        return agenda_id, claim, {
+            "score": cached_score,
+            "reasoning": cached_reasoning,
+            "claim": claim,
+            "numeric_score": cached_numeric,
+            "article_scores": cached_article_scores,
+            "is_cached": True,
+            "is_stale": bool(is_stale)
+        }
+    return agenda_id, claim, None
+
+
+def compute_shared_analysis(agenda_id: int, claim: str) -> dict:
+    """
+    Analyze a shared agenda with no usable cached result and persist real LLM
+    results; runs on the analysis pool, once per agenda at a time.
+    """
+    with db.read() as cursor:
+        queries.run(cursor, _ANALYSIS_ARTICLES, (agenda_id,))
         articles = cursor.fetchall()
-        
-        # 3. LLM Analysis Logic
-        
-        # Prepare evidence
-        evidence_items = []
-        for i, a in enumerate(articles):
-            # a = (title, url, description)
-            url = a[1]
-            excerpt = fetch_article_excerpt(url)
-            evidence_items.append({
-                "id": f"a{i}",
-                "title": a[0],
-                "url": url,
-                "publisher": urlparse(url).netloc,
-                "excerpt": excerpt
-            })
-            
-        # Try real LLM first
-        llm_result = call_llm_analysis(claim, evidence_items)
-        if llm_result:
-            return llm_result
-
-        # Fallback to Simulation
-        time.sleep(1.5) # Fake "thinking" time
-        
-        count = len(articles)
-        
-        if count == 0:
-            return {
-                "score": "Low",
-                "reasoning": "No evidence provided. Please add articles to verify this claim.",
-                "claim": claim
-            }
 
-        # CRITERIA 1: Keywords looking for "Hard Evidence" 
-        authoritative_keywords = ["report", "study", "evidence", "confirmed", "analysis", "data", "statistics", "review", "official", "survey", "court", "verdict", "proof", "science", "research"]
-        
-        quality_matches = 0
-        for a in articles:
-            text_blob = (str(a[0]) + " " + str(a[2])).lower()
-            if any(kw in text_blob for kw in authoritative_keywords):
-                quality_matches += 1
-
-        # CRITERIA 2: Diversity of Sources
-        unique_domains = set()
-        for a in articles:
-            url = a[1]
-            try:
-                domain = urlparse(url).netloc.replace('www.', '')
-                if domain:
-                    unique_domains.add(domain)
-            except:
-                pass
-        
-        num_unique = len(unique_domains)
-        
-        # SCORING ALGORITHM
-        points = (count * 10) + (num_unique * 15) + (quality_matches * 10)
+    if _shared_llm_failures.get(agenda_id) is not None:
+        # The heuristic only reads the stored titles, descriptions and URLs: no scraping needed
+        print(f"DEBUG: Shared agenda {agenda_id} LLM run failed recently, serving heuristic result")
+        return dict(simulate_shared_analysis(claim, articles), is_cached=False, is_stale=False)
 
-        score = "Low"
-        reasoning_detail = ""
-
-        if points >= 65: 
-            score = "High"
-            reasoning_detail = f"Strong consensus detected across about {num_unique} unique domains. The semantic analysis identified authoritative terminology (e.g., study, data) that strongly supports the claim."
-        elif points >= 35: 
-            score = "Medium"
-            reasoning_detail = f"Evidence is present ({count} sources) and appears relevant. Usage of { 'a single source' if num_unique == 1 else 'diverse sources' } provides a partial correlation. Adding one more distinct source would likely elevate this to a high confidence level."
-        else:
-            score = "Low"
-            reasoning_detail = f"Insufficient data density. With only {count} source(s) and limited cross-referencing, the claim lacks the verifiable weight required for a definitive rating."
-            
+    evidence_items = build_evidence(articles)
+    llm_result = call_llm_analysis(claim, evidence_items)
+    if llm_result:
+        save_analysis(agenda_id, llm_result, len(articles), evidence_fingerprint(claim, evidence_items))
+        return dict(llm_result, is_cached=False, is_stale=False)
+    _shared_llm_failures.set(agenda_id, True)
+
+    # Heuristic fallback; not persisted so a later successful run replaces it
+    return dict(simulate_shared_analysis(claim, articles), is_cached=False, is_stale=False)
+
+
+def simulate_shared_analysis(claim: str, articles: list) -> dict:
+    """Keyword/diversity heuristic used when no LLM result is available."""
+    count = len(articles)
+    
+    if count == 0:
         return {
-            "score": score,
-            "reasoning": reasoning_detail, 
+            "score": "Low",
+            "reasoning": "No evidence provided. Please add articles to verify this claim.",
             "claim": claim
         }
 
-    finally:
-        conn.close()
+    # CRITERIA 1: Keywords looking for "Hard Evidence" 
+    authoritative_keywords = ["report", "study", "evidence", "confirmed", "analysis", "data", "statistics", "review", "official", "survey", "court", "verdict", "proof", "science", "research"]
+    
+    quality_matches = 0
+    for a in articles:
+        text_blob = (str(a[0]) + " " + str(a[2])).lower()
+        if any(kw in text_blob for kw in authoritative_keywords):
+            quality_matches += 1
+
+    # CRITERIA 2: Diversity of Sources
+    unique_domains = set()
+    for a in articles:
+        url = a[1]
+        try:
+            domain = urlparse(url).netloc.replace('www.', '')
+            if domain:
+                unique_domains.add(domain)
+        except:
+            pass
+    
+    num_unique = len(unique_domains)
+    
+    # SCORING ALGORITHM
+    points = (count * 10) + (num_unique * 15) + (quality_matches * 10)
+
+    score = "Low"
+    reasoning_detail = ""
+
+    if points >= 65: 
+        score = "High"
+        reasoning_detail = f"Strong consensus detected across about {num_unique} unique domains. The semantic analysis identified authoritative terminology (e.g., study, data) that strongly supports the claim."
+    elif points >= 35: 
+        score = "Medium"
+        reasoning_detail = f"Evidence is present ({count} sources) and appears relevant. Usage of { 'a single source' if num_unique == 1 else 'diverse sources' } provides a partial correlation. Adding one more distinct source would likely elevate this to a high confidence level."
+    else:
+        score = "Low"
+        reasoning_detail = f"Insufficient data density. With only {count} source(s) and limited cross-referencing, the claim lacks the verifiable weight required for a definitive rating."
+        
+    return {
+        "score": score,
+        "reasoning": reasoning_detail, 
+        "claim": claim
+    }
 
 
 @router.post("/{agenda_id}/analyze")
@@ -847,15 +941,55 @@ async def analyze_agenda_claim(
     """
     Analyze the agenda claim against its articles using (Simulated) AI.
     Eventually, this will connect to a real LLM API (OpenAI/Anthropic).
+    Joins the agenda's running analysis, if any (see submit_agenda_analysis).
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        # 1. Fetch Agenda
-        cursor.execute(
-            "SELECT title, analysis_score, analysis_reasoning, last_analyzed_at, analysis_article_count, analysis_numeric_score FROM agendas WHERE id = %s AND user_id = %s",
-            (agenda_id, current_user.id)
+    job = submit_agenda_analysis(agenda_id, current_user.id, force_refresh)
+    # Shielded so a client disconnecting doesn't cancel a run others may be waiting on
+    await asyncio.shield(asyncio.wrap_future(job.future))
+    if job.status == FAILED:
+        raise HTTPException(
+            status_code=job.error_status,
+            detail=job.error if job.error_status != 500 else "Analysis failed"
         )
+    return job.result
+
+
+def submit_agenda_analysis(agenda_id: int, user_id: int, force_refresh: bool, progress: bool = False) -> Job:
+    """
+    Start or join the agenda's analysis job; /analyze, /analyze/stream and
+    /analyze/jobs all go through here, so concurrent requests never scrape
+    and call the LLM twice for one agenda. A forced refresh never joins a
+    plain run (which may just return the cached result); a plain request
+    joins either. The caller's id is part of the key, so only the owner's
+    requests can share a run.
+    """
+    plain = ("agenda", agenda_id, user_id, False)
+    forced = ("agenda", agenda_id, user_id, True)
+    job, _ = analysis_jobs.submit(
+        forced if force_refresh else plain,
+        run_agenda_analysis, agenda_id, user_id, force_refresh,
+        also=() if force_refresh else (forced,),
+        progress=progress,
+        owner_id=user_id,
+        agenda_id=agenda_id
+    )
+    return job
+
+
+_AGENDA_ANALYSIS = queries.register(
+    "agenda_analysis",
+    "SELECT title, analysis_score, analysis_reasoning, last_analyzed_at, analysis_article_count, analysis_numeric_score, analysis_fingerprint, analysis_article_scores FROM agendas WHERE id = %s AND user_id = %s"
+)
+
+
+def run_agenda_analysis(agenda_id: int, user_id: int, force_refresh: bool = False, on_event=None) -> dict:
+    """
+    Blocking body of analyze_agenda_claim; runs on the analysis pool.
+    `on_event(event, data)` receives progress events (see stream_agenda_analysis).
+    """
+    with db.read() as cursor:
+        # 1. Fetch Agenda
+        queries.run(cursor, _AGENDA_ANALYSIS, (agenda_id, user_id))
         agenda_row = cursor.fetchone()
         if not agenda_row:
             raise HTTPException(status_code=404, detail="Agenda not found")
@@ -863,99 +997,228 @@ async def analyze_agenda_claim(
         claim = agenda_row[0]
         cached_score = agenda_row[1]
         cached_reasoning = agenda_row[2]
-        cached_count = agenda_row[4]
         cached_numeric = agenda_row[5]
+        cached_fingerprint = agenda_row[6]
+        cached_article_scores = agenda_row[7]
         
         # 2. Fetch Articles
-        cursor.execute(
-            "SELECT title, url, description FROM articles WHERE agenda_id = %s",
-            (agenda_id,)
-        )
+        queries.run(cursor, _ANALYSIS_ARTICLES, (agenda_id,))
         articles = cursor.fetchall()
         current_count = len(articles)
+    # Connection released before scraping/LLM work; save_analysis takes its own
+
+    # Excerpts come from the excerpt cache, so fingerprinting is cheap on repeat calls
+    if on_event:
+        on_event("phase", {"phase": "fetching", "articles": current_count})
+    evidence_items = build_evidence(articles, on_event=on_event)
+    fingerprint = evidence_fingerprint(claim, evidence_items)
 
-        # Check for cache validity
-        if cached_score and cached_reasoning and not force_refresh:
-             if cached_count == current_count:
-                 return {
-                     "score": cached_score,
-                     "reasoning": cached_reasoning,
-                     "claim": claim,
-                     "numeric_score": cached_numeric,
-                     "is_cached": True,
-                     "is_stale": False
-                 }
-             else:
-                 # Return STALE cache so user can decide to re-run
-                 return {
-                     "score": cached_score,
-                     "reasoning": cached_reasoning,
-                     "claim": claim,
-                     "numeric_score": cached_numeric,
-                     "is_cached": True,
-                     "is_stale": True
-                 }
+    # Check for cache validity: fresh only if claim and evidence are unchanged
+    if cached_score and cached_reasoning and not force_refresh:
+        return {
+            "score": cached_score,
+            "reasoning": cached_reasoning,
+            "claim": claim,
+            "numeric_score": cached_numeric,
+            "article_scores": cached_article_scores,
+            "is_cached": True,
+            # STALE cache is still returned so user can decide to re-run
+            "is_stale": cached_fingerprint != fingerprint
+        }
+
+    # Try real LLM first
+    llm_result = call_llm_analysis(claim, evidence_items, on_event=on_event, force_refresh=force_refresh)
+    
+    result = None
+    if llm_result:
+        result = llm_result
+    else:
+        # Fallback to Simulation if LLM fails or no key
+        time.sleep(1.5) # Fake "thinking" time
         
-        evidence_items = []
-        for i, a in enumerate(articles):
-            # a = (title, url, description)
-            url = a[1]
-            excerpt = fetch_article_excerpt(url)
-            evidence_items.append({
-                "id": f"a{i}",
-                "title": a[0],
-                "url": url,
-                "publisher": urlparse(url).netloc,
-                "excerpt": excerpt
-            })
-            
-        # Try real LLM first
-        llm_result = call_llm_analysis(claim, evidence_items)
+        count = len(articles)
         
-        result = None
-        if llm_result:
-            result = llm_result
+        if count == 0:
+            result = {
+                "score": "Low",
+                "reasoning": "No evidence provided. Please add articles to verify this claim.",
+                "claim": claim
+            }
         else:
-            # Fallback to Simulation if LLM fails or no key
-            time.sleep(1.5) # Fake "thinking" time
-            
-            count = len(articles)
-            
-            if count == 0:
-                result = {
-                    "score": "Low",
-                    "reasoning": "No evidence provided. Please add articles to verify this claim.",
-                    "claim": claim
-                }
-            else:
-                 # Sim Logic
-                result = {
-                    "score": "Low",
-                    "reasoning": f"Analysis simulation (Real AI failed). Based on {count} articles.",
-                    "claim": claim
-                }
-
-        # Save Cache
-        if result and result.get("score"):
-             try:
-                cursor.execute("""
-                    UPDATE agendas
-                    SET analysis_score = %s,
-                        analysis_reasoning = %s,
-                        last_analyzed_at = CURRENT_TIMESTAMP,
-                        analysis_article_count = %s,
-                        analysis_numeric_score = %s
-                    WHERE id = %s
-                """, (result["score"], result["reasoning"], current_count, result.get("numeric_score"), agenda_id))
-                conn.commit()
-             except Exception as e:
-                print(f"Cache update failed: {e}")
-                conn.rollback()
-
-        # Add stale flag to result (it's fresh now)
-        result["is_cached"] = False
-        result["is_stale"] = False
-        return result
-
-    finally:
-        conn.close()
+             # Sim Logic
+            result = {
+                "score": "Low",
+                "reasoning": f"Analysis simulation (Real AI failed). Based on {count} articles.",
+                "claim": claim
+            }
+
+    # Save Cache
+    if result and result.get("score"):
+        # Simulated fallbacks are never recorded as a fresh match for this evidence
+        save_analysis(agenda_id, result, current_count, fingerprint if llm_result else None)
+
+    # Add stale flag to result (it's fresh now)
+    result["is_cached"] = False
+    result["is_stale"] = False
+    return result
+
+
+_SAVE_ANALYSIS = queries.register(
+    "agenda_save_analysis",
+    """UPDATE agendas
+       SET analysis_score = %s,
+           analysis_reasoning = %s,
+           last_analyzed_at = CURRENT_TIMESTAMP,
+           analysis_article_count = %s,
+           analysis_numeric_score = %s,
+           analysis_fingerprint = %s,
+           analysis_article_scores = %s
+       WHERE id = %s"""
+)
+
+
+def save_analysis(agenda_id: int, result: dict, article_count: int, fingerprint: Optional[str]):
+    """Persist an analysis result into the agenda's analysis_* cache columns."""
+    try:
+        with db.transaction() as cursor:
+            queries.run(cursor, _SAVE_ANALYSIS, (
+                result["score"], result["reasoning"], article_count, result.get("numeric_score"),
+                fingerprint,
+                Json(result.get("article_scores")) if result.get("article_scores") else None,
+                agenda_id
+            ))
+    except Exception as e:
+        print(f"Cache update failed: {e}")
+
+
+def _sse_event(event: str, data) -> str:
+    """Format one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data), ensure_ascii=False)}\n\n"
+
+
+_AGENDA_OWNED = queries.register("agenda_owned", "SELECT id FROM agendas WHERE id = %s AND user_id = %s")
+
+
+def _require_agenda(agenda_id: int, user_id: int):
+    """404 unless the agenda exists and belongs to the user."""
+    with db.read() as cursor:
+        queries.run(cursor, _AGENDA_OWNED, (agenda_id, user_id))
+        if not cursor.fetchone():
+            raise HTTPException(status_code=404, detail="Agenda not found")
+
+
+@router.post("/{agenda_id}/analyze/stream")
+async def stream_agenda_analysis(
+    agenda_id: int,
+    force_refresh: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Analyze an agenda and stream progress as Server-Sent Events:
+
+    - `phase`: fetching / auditing / summarizing
+    - `evidence`: one per article once its page has been fetched (or failed)
+    - `audit`: one per article score as soon as it's known (cached scores
+      first, then each audit as the model writes it; a later event for the
+      same id replaces an earlier one)
+    - `result`: the final AnalysisResult, then the stream ends
+    - `error`: `{status_code, detail}` if the analysis failed
+
+    If the agenda is already being analyzed, the stream follows that run:
+    its events so far are replayed first. A run started by /analyze or
+    /analyze/jobs records no progress, so only its `result` arrives.
+    The analysis runs to completion (and updates the cache) even if the
+    client leaves.
+    """
+    await run_in_threadpool(_require_agenda, agenda_id, current_user.id)
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    job = submit_agenda_analysis(agenda_id, current_user.id, force_refresh, progress=True)
+    job.subscribe(lambda event, data: loop.call_soon_threadsafe(queue.put_nowait, (event, data)))
+
+    async def events():
+        yield _sse_event("started", {"agenda_id": agenda_id})
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), timeout=15)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield _sse_event(event, data)
+            if event in ("result", "error"):
+                return
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _get_owned_job(job_id: str, user_id: int) -> Job:
+    job = analysis_jobs.get(job_id)
+    if job is None or job.owner_id != user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/{agenda_id}/analyze/jobs", response_model=AnalysisJob, status_code=status.HTTP_202_ACCEPTED)
+def submit_analysis_job(
+    agenda_id: int,
+    force_refresh: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Queue an analysis of the agenda and return the job immediately.
+    If the agenda is already being analyzed, the running job is returned
+    instead, unless this is a forced refresh and that run isn't one.
+    """
+    _require_agenda(agenda_id, current_user.id)
+    return submit_agenda_analysis(agenda_id, current_user.id, force_refresh).to_dict()
+
+
+@router.get("/jobs/{job_id}", response_model=AnalysisJob)
+def get_analysis_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Poll a background analysis job. `result` is set once status is "done".
+    """
+    return _get_owned_job(job_id, current_user.id).to_dict()
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_analysis_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stream a background analysis job as Server-Sent Events: a `queued`/`running`
+    event on every status change, then a final `done` or `failed` event.
+    """
+    job = _get_owned_job(job_id, current_user.id)
+
+    async def events():
+        last_status = None
+        idle = 0.0
+        while True:
+            if job.status != last_status:
+                last_status = job.status
+                yield _sse_event(job.status, job.to_dict())
+                idle = 0.0
+            if job.finished:
+                return
+            if await wait_for_job(job, 1.0):
+                continue
+            idle += 1.0
+            if idle >= 15:
+                yield ": keep-alive\n\n"
+                idle = 0.0
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
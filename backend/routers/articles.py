@@ -1,40 +1,29 @@
 """
 Article CRUD routes for managing articles within agendas.
 """
-from typing import List
-from fastapi import APIRouter, HTTPException, Depends, status
-from database import get_db_connection
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, status
+import database as db
+import queries
+from pagination import MAX_PAGE_SIZE, keyset_params, trim_page
 from models import User, Article, CreateArticle
 from security import get_current_user
 
 router = APIRouter()
 
 
-def verify_agenda_ownership(agenda_id: int, user_id: int) -> bool:
-    """
-    Verify that the user owns the specified agenda.
-    
-    Args:
-        agenda_id: ID of the agenda to check
-        user_id: ID of the user
-    
-    Returns:
-        True if user owns the agenda, False otherwise
-    """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "SELECT id FROM agendas WHERE id = %s AND user_id = %s",
-            (agenda_id, user_id)
-        )
-        return cursor.fetchone() is not None
-    finally:
-        conn.close()
+# The explicit cast gives the SELECT-list parameter a type when the statement is prepared
+_INSERT_ARTICLE = queries.register(
+    "article_insert",
+    """INSERT INTO articles (agenda_id, title, url, description, image)
+       SELECT %s::integer, %s, %s, %s, %s
+       WHERE EXISTS (SELECT 1 FROM agendas WHERE id = %s AND user_id = %s)
+       RETURNING id, agenda_id, title, url, description, image, created_at"""
+)
 
 
 @router.post("/agendas/{agenda_id}/articles", response_model=Article, status_code=status.HTTP_201_CREATED)
-async def create_article(
+def create_article(
     agenda_id: int,
     article: CreateArticle,
     current_user: User = Depends(get_current_user)
@@ -53,21 +42,16 @@ async def create_article(
     Raises:
         HTTPException: If agenda not found or user doesn't own it
     """
-    # Verify agenda ownership
-    if not verify_agenda_ownership(agenda_id, current_user.id):
-        raise HTTPException(status_code=404, detail="Agenda not found")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            """INSERT INTO articles (agenda_id, title, url, description, image) 
-               VALUES (%s, %s, %s, %s, %s) 
-               RETURNING id, agenda_id, title, url, description, image, created_at""",
-            (agenda_id, article.title, article.url, article.description, article.image)
+    with db.transaction() as cursor:
+        # Insert only if the agenda belongs to the user (no separate ownership query)
+        queries.run(
+            cursor,
+            _INSERT_ARTICLE,
+            (agenda_id, article.title, article.url, article.description, article.image, agenda_id, current_user.id)
         )
         row = cursor.fetchone()
-        conn.commit()
+        if not row:
+            raise HTTPException(status_code=404, detail="Agenda not found")
         return Article(
             id=row[0],
             agenda_id=row[1],
@@ -77,20 +61,41 @@ async def create_article(
             image=row[5],
             createdAt=row[6]
         )
-    finally:
-        conn.close()
+
+
+def _list_articles_sql(after: bool) -> str:
+    # Ownership check and listing in one query: no rows means the agenda isn't
+    # the user's, a single all-NULL article row means it has no articles
+    return f"""SELECT ar.id, ar.agenda_id, ar.title, ar.url, ar.description, ar.image, ar.created_at
+               FROM agendas ag
+               LEFT JOIN articles ar ON ar.agenda_id = ag.id
+                   {"AND (ar.created_at, ar.id) < (%s, %s)" if after else ""}
+               WHERE ag.id = %s AND ag.user_id = %s
+               ORDER BY ar.created_at DESC, ar.id DESC
+               LIMIT %s"""
+
+
+_LIST_ARTICLES = {
+    after: queries.register(f"articles_list{'_after' if after else ''}", _list_articles_sql(after))
+    for after in (False, True)
+}
 
 
 @router.get("/agendas/{agenda_id}/articles", response_model=List[Article])
-async def get_articles(
+def get_articles(
     agenda_id: int,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit to get every article"),
+    after: Optional[str] = Query(None, alias="cursor", description="X-Next-Cursor value from the previous page"),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Get all articles for a specific agenda.
+    Get all articles for a specific agenda, newest first.
     
     Args:
         agenda_id: ID of the agenda
+        limit: Optional page size; the next page's cursor is returned in X-Next-Cursor
+        after: Cursor from a previous page
         current_user: Authenticated user from JWT token
     
     Returns:
@@ -99,21 +104,17 @@ async def get_articles(
     Raises:
         HTTPException: If agenda not found or user doesn't own it
     """
-    # Verify agenda ownership
-    if not verify_agenda_ownership(agenda_id, current_user.id):
-        raise HTTPException(status_code=404, detail="Agenda not found")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            """SELECT id, agenda_id, title, url, description, image, created_at 
-               FROM articles 
-               WHERE agenda_id = %s 
-               ORDER BY created_at DESC""",
-            (agenda_id,)
+    after_created_at, after_id, fetch_limit = keyset_params(after, limit)
+    with db.read() as cursor:
+        queries.run(
+            cursor,
+            _LIST_ARTICLES[bool(after)],
+            (*((after_created_at, after_id) if after else ()), agenda_id, current_user.id, fetch_limit)
         )
         rows = cursor.fetchall()
+        if not rows:
+            raise HTTPException(status_code=404, detail="Agenda not found")
+        rows = trim_page([r for r in rows if r[0] is not None], fetch_limit, response, created_at_index=6, id_index=0)
         return [
             Article(
                 id=r[0],
@@ -125,12 +126,20 @@ async def get_articles(
                 createdAt=r[6]
             ) for r in rows
         ]
-    finally:
-        conn.close()
+
+
+_DELETE_ARTICLE = queries.register(
+    "article_delete",
+    """DELETE FROM articles
+       USING agendas
+       WHERE articles.id = %s
+         AND articles.agenda_id = agendas.id
+         AND agendas.user_id = %s"""
+)
 
 
 @router.delete("/articles/{article_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_article(
+def delete_article(
     article_id: int,
     current_user: User = Depends(get_current_user)
 ):
@@ -144,22 +153,8 @@ async def delete_article(
     Raises:
         HTTPException: If article not found or user doesn't own the parent agenda
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        # Verify ownership through agenda
-        cursor.execute(
-            """SELECT articles.id 
-               FROM articles 
-               JOIN agendas ON articles.agenda_id = agendas.id 
-               WHERE articles.id = %s AND agendas.user_id = %s""",
-            (article_id, current_user.id)
-        )
-        if not cursor.fetchone():
+    with db.transaction() as cursor:
+        # Delete only if the parent agenda belongs to the user
+        queries.run(cursor, _DELETE_ARTICLE, (article_id, current_user.id))
+        if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Article not found")
-        
-        # Delete article
-        cursor.execute("DELETE FROM articles WHERE id = %s", (article_id,))
-        conn.commit()
-    finally:
-        conn.close()
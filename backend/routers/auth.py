@@ -2,15 +2,28 @@
 Authentication routes for user registration, login, and profile.
 """
 from fastapi import APIRouter, HTTPException, Depends, status
-from database import get_db_connection
+import database as db
+import queries
 from models import User, UserRegister, UserLogin, Token
-from security import get_password_hash, verify_password, create_access_token, get_current_user
+from security import get_password_hash, verify_password, create_user_token, cache_user, get_current_user
 
 router = APIRouter()
 
+# Registration is rare, so its statements are only checked at startup, not prepared
+_EMAIL_TAKEN = queries.register("user_email_taken", "SELECT id FROM users WHERE email = %s", prepare=False)
+_INSERT_USER = queries.register(
+    "user_insert",
+    "INSERT INTO users (email, password_hash, name) VALUES (%s, %s, %s) RETURNING id, created_at",
+    prepare=False
+)
+_USER_BY_EMAIL = queries.register(
+    "user_by_email",
+    "SELECT id, password_hash, email, name, created_at FROM users WHERE email = %s"
+)
+
 
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserRegister):
+def register(user_data: UserRegister):
     """
     Register a new user.
     
@@ -23,53 +36,47 @@ async def register(user_data: UserRegister):
     Raises:
         HTTPException: If email already exists or registration fails
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # Validate password length (bcrypt has 72 byte limit)
+    if len(user_data.password.encode('utf-8')) > 72:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Password too long. Maximum 72 characters."
+        )
+    
+    # Hash before taking a connection so it isn't held through bcrypt
+    hashed_password = get_password_hash(user_data.password)
     
     try:
-        # Validate password length (bcrypt has 72 byte limit)
-        if len(user_data.password.encode('utf-8')) > 72:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Password too long. Maximum 72 characters."
-            )
-        
-        # Check if user already exists
-        cursor.execute("SELECT id FROM users WHERE email = %s", (user_data.email,))
-        if cursor.fetchone():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
-        
-        # Hash password and create user
-        hashed_password = get_password_hash(user_data.password)
-        cursor.execute(
-            "INSERT INTO users (email, password_hash, name) VALUES (%s, %s, %s) RETURNING id",
-            (user_data.email, hashed_password, user_data.name)
-        )
-        user_id = cursor.fetchone()[0]
-        conn.commit()
-        
-        # Create access token
-        access_token = create_access_token(data={"sub": user_id})
-        
-        return Token(access_token=access_token, token_type="bearer")
-        
-    except HTTPException:
+        with db.transaction() as cursor:
+            # Check if user already exists
+            queries.run(cursor, _EMAIL_TAKEN, (user_data.email,))
+            if cursor.fetchone():
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Email already registered"
+                )
+            
+            queries.run(cursor, _INSERT_USER, (user_data.email, hashed_password, user_data.name))
+            user_row = cursor.fetchone()
+    except (HTTPException, db.DatabaseUnavailable):
         raise
     except Exception as e:
-        conn.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Registration failed: {str(e)}"
         )
-    finally:
-        conn.close()
+    
+    user = User(id=user_row[0], email=user_data.email, name=user_data.name, created_at=user_row[1])
+    cache_user(user)
+    
+    # Create access token
+    access_token = create_user_token(user)
+    
+    return Token(access_token=access_token, token_type="bearer")
 
 
 @router.post("/login", response_model=Token)
-async def login(user_data: UserLogin):
+def login(user_data: UserLogin):
     """
     Login user and return JWT token.
     
@@ -82,33 +89,27 @@ async def login(user_data: UserLogin):
     Raises:
         HTTPException: If credentials are invalid
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # Find user by email
+    with db.read() as cursor:
+        queries.run(cursor, _USER_BY_EMAIL, (user_data.email,))
+        user_row = cursor.fetchone()
     
-    try:
-        # Find user by email
-        cursor.execute(
-            "SELECT id, password_hash FROM users WHERE email = %s",
-            (user_data.email,)
+    # Connection is already back in the pool while bcrypt runs
+    if not user_row or not verify_password(user_data.password, user_row[1]):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
         )
-        user_row = cursor.fetchone()
-        
-        if not user_row or not verify_password(user_data.password, user_row[1]):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Incorrect email or password",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        user_id = user_row[0]
-        
-        # Create access token
-        access_token = create_access_token(data={"sub": user_id})
-        
-        return Token(access_token=access_token, token_type="bearer")
-        
-    finally:
-        conn.close()
+    
+    # Refresh the cached profile with the row we just read
+    user = User(id=user_row[0], email=user_row[2], name=user_row[3], created_at=user_row[4])
+    cache_user(user)
+    
+    # Create access token
+    access_token = create_user_token(user)
+    
+    return Token(access_token=access_token, token_type="bearer")
 
 
 @router.get("/me", response_model=User)
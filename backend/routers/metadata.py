@@ -1,10 +1,18 @@
 """
 Metadata extraction routes for scraping article information from URLs.
 """
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel, HttpUrl
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, HttpUrl
+from typing import List, Optional, Tuple
 import requests
-from bs4 import BeautifulSoup
+from config import EXTRACT_BATCH_MAX_URLS, EXTRACT_BATCH_WORKERS
+from metadata_extractor import parse_metadata
+from http_client import get_session
+from scraper import fetch_html
+from url_cache import metadata_cache, iframe_cache
 
 router = APIRouter()
 
@@ -19,79 +27,73 @@ class ExtractedMetadata(BaseModel):
     image: str | None
 
 
+class ExtractBatchRequest(BaseModel):
+    urls: List[HttpUrl] = Field(..., min_length=1, max_length=EXTRACT_BATCH_MAX_URLS)
+
+
+class ExtractBatchItem(BaseModel):
+    index: int
+    url: str
+    metadata: Optional[ExtractedMetadata] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+
+
 class IframeCheckResponse(BaseModel):
     blocked: bool
 
 
-@router.post("/extract", response_model=ExtractedMetadata)
-async def extract_metadata(data: ExtractURLRequest):
+def _charset_of(headers) -> str | None:
+    """Charset declared in Content-Type, if any (otherwise let the parser sniff <meta charset>)."""
+    for param in headers.get("Content-Type", "").split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset" and value.strip():
+            return value.strip().strip('"')
+    return None
+
+
+# Batch fetches run here, sharing the pooled keep-alive session
+_batch_executor = ThreadPoolExecutor(max_workers=EXTRACT_BATCH_WORKERS, thread_name_prefix="extract-batch")
+
+
+def fetch_metadata(url: str) -> Tuple[dict, bool]:
     """
-    Extract metadata (title, description, image) from a URL.
-    
-    Args:
-        data: Request containing the URL to extract metadata from
-    
-    Returns:
-        Extracted metadata including title, description, and image URL
-    
-    Raises:
-        HTTPException: If URL cannot be fetched or parsed
+    Fetch a page and extract its metadata.
+    Returns (payload, ok); on failure the payload carries the HTTP error to report.
     """
     try:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
-        response = requests.get(str(data.url), headers=headers, timeout=10)
-        response.raise_for_status()
+        # og:/twitter: tags live in <head>, so stop reading once it closes
+        response = fetch_html(url, timeout=10, headers=headers, stop_at_head=True)
+        if response.status_code >= 400:
+            raise requests.HTTPError(f"{response.status_code} Error for url: {response.url}")
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        metadata = parse_metadata(response.body, encoding=_charset_of(response.headers))
         
-        # Extract title
-        title = None
-        if soup.find('meta', property='og:title'):
-            title = soup.find('meta', property='og:title').get('content')
-        elif soup.find('title'):
-            title = soup.find('title').string
-        
-        # Extract description
-        description = None
-        if soup.find('meta', property='og:description'):
-            description = soup.find('meta', property='og:description').get('content')
-        elif soup.find('meta', attrs={'name': 'description'}):
-            description = soup.find('meta', attrs={'name': 'description'}).get('content')
-        
-        # Extract image
-        image = None
-        if soup.find('meta', property='og:image'):
-            image = soup.find('meta', property='og:image').get('content')
-        
-        return ExtractedMetadata(
-            title=title or "No title found",
-            description=description or "No description found",
-            image=image
-        )
+        return {
+            "title": metadata["title"] or "No title found",
+            "description": metadata["description"] or "No description found",
+            "image": metadata["image"]
+        }, True
     except requests.RequestException as e:
-        raise HTTPException(status_code=400, detail=f"Failed to fetch URL: {str(e)}")
+        return {"error_status": 400, "error": f"Failed to fetch URL: {str(e)}"}, False
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to extract metadata: {str(e)}")
+        return {"error_status": 500, "error": f"Failed to extract metadata: {str(e)}"}, False
 
 
-@router.get("/check-iframe", response_model=IframeCheckResponse)
-async def check_iframe(url: str):
+def probe_iframe(url: str) -> Tuple[dict, bool]:
     """
-    Check if a URL allows iframe embedding.
-    
-    Args:
-        url: URL to check for iframe compatibility
-    
-    Returns:
-        Boolean indicating whether the URL can be embedded in an iframe
+    Check a URL's X-Frame-Options / CSP headers.
+    Returns (payload, ok); unreachable URLs are reported as blocked. Error
+    responses are still judged by their headers but cached only briefly.
     """
     try:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
-        response = requests.head(url, headers=headers, timeout=5, allow_redirects=True)
+        response = get_session().head(url, headers=headers, timeout=5, allow_redirects=True)
         
         # Check X-Frame-Options header
         x_frame_options = response.headers.get('X-Frame-Options', '')
@@ -101,14 +103,90 @@ async def check_iframe(url: str):
         xfo_l = x_frame_options.lower()
         csp_l = csp.lower()
 
-        if (
+        blocked = (
             'deny' in xfo_l or
             'sameorigin' in xfo_l or
             'frame-ancestors' in csp_l
-        ):
-            return IframeCheckResponse(blocked=True)
-
-        return IframeCheckResponse(blocked=False)
+        )
+        # Many publishers answer HEAD with 403/405 and still allow framing, so
+        # keep the header verdict; only a transient error mustn't stick for long
+        return {"blocked": blocked}, response.status_code < 400
     except Exception:
         # Network error or other issue — assume blocked (conservative)
-        return IframeCheckResponse(blocked=True)
+        return {"blocked": True}, False
+
+
+@router.post("/extract", response_model=ExtractedMetadata)
+def extract_metadata(data: ExtractURLRequest):
+    """
+    Extract metadata (title, description, image) from a URL.
+    Results (including failures) are cached per canonical URL.
+    
+    Args:
+        data: Request containing the URL to extract metadata from
+    
+    Returns:
+        Extracted metadata including title, description, and image URL
+    
+    Raises:
+        HTTPException: If URL cannot be fetched or parsed
+    """
+    url = str(data.url)
+    payload = metadata_cache.get_or_fetch(url, lambda: fetch_metadata(url))
+    if "error" in payload:
+        raise HTTPException(status_code=payload["error_status"], detail=payload["error"])
+    return ExtractedMetadata(**payload)
+
+
+def _extract_batch_item(index: int, url: str) -> ExtractBatchItem:
+    payload = metadata_cache.get_or_fetch(url, lambda: fetch_metadata(url))
+    if "error" in payload:
+        return ExtractBatchItem(index=index, url=url, error=payload["error"], status_code=payload["error_status"])
+    return ExtractBatchItem(index=index, url=url, metadata=ExtractedMetadata(**payload))
+
+
+@router.post("/extract/batch")
+def extract_metadata_batch(data: ExtractBatchRequest):
+    """
+    Extract metadata for several URLs at once.
+    
+    Pages are fetched concurrently and the response is streamed as NDJSON,
+    one ExtractBatchItem per line in completion order (use `index` to map
+    back to the request). A failing URL yields an item with `error` set
+    instead of failing the whole batch.
+    
+    Args:
+        data: Request containing up to EXTRACT_BATCH_MAX_URLS URLs
+    
+    Returns:
+        application/x-ndjson stream of ExtractBatchItem objects
+    """
+    urls = [str(u) for u in data.urls]
+
+    def stream():
+        futures = [_batch_executor.submit(_extract_batch_item, i, url) for i, url in enumerate(urls)]
+        try:
+            for future in as_completed(futures):
+                yield json.dumps(future.result().model_dump()) + "\n"
+        finally:
+            # Client went away: drop whatever hasn't started yet
+            for future in futures:
+                future.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.get("/check-iframe", response_model=IframeCheckResponse)
+def check_iframe(url: str):
+    """
+    Check if a URL allows iframe embedding.
+    Results (including failures) are cached per canonical URL.
+    
+    Args:
+        url: URL to check for iframe compatibility
+    
+    Returns:
+        Boolean indicating whether the URL can be embedded in an iframe
+    """
+    payload = iframe_cache.get_or_fetch(url, lambda: probe_iframe(url))
+    return IframeCheckResponse(blocked=payload["blocked"])
@@ -0,0 +1,312 @@
+"""
+Article scraping utilities.
+Fetches article pages and extracts plain-text excerpts used as LLM evidence.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+import excerpt_cache
+from http_client import get_session
+from config import (
+    EXCERPT_CACHE_MAX_WORDS,
+    EXCERPT_FETCH_TIMEOUT,
+    EXCERPT_FETCH_WORKERS,
+    EXCERPT_FETCH_PER_DOMAIN,
+    EXCERPT_FETCH_DEADLINE,
+    HTML_MAX_BYTES,
+)
+
+BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# Only these response types are downloaded and parsed
+HTML_CONTENT_TYPES = {"text/html", "application/xhtml+xml"}
+HTML_CHUNK_SIZE = 16 * 1024
+
+# Shared worker pool for excerpt fetching (bounded across all requests)
+_executor = ThreadPoolExecutor(max_workers=EXCERPT_FETCH_WORKERS, thread_name_prefix="excerpt-fetch")
+
+# Per-domain semaphores so one batch can't hammer a single publisher
+_domain_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_domain_lock = threading.Lock()
+# How often a batch re-checks a domain whose slots are all held by other batches
+DOMAIN_SLOT_POLL_INTERVAL = 0.05
+
+
+def _domain_key(url: str) -> str:
+    try:
+        return urlparse(url).netloc.lower().replace('www.', '') or 'unknown'
+    except Exception:
+        return 'unknown'
+
+
+def _domain_semaphore(domain: str) -> threading.BoundedSemaphore:
+    with _domain_lock:
+        sem = _domain_semaphores.get(domain)
+        if sem is None:
+            sem = threading.BoundedSemaphore(EXCERPT_FETCH_PER_DOMAIN)
+            _domain_semaphores[domain] = sem
+        return sem
+
+
+class UnsupportedContent(requests.RequestException):
+    """The response isn't an HTML document we're willing to parse."""
+
+
+class FetchedPage:
+    """Status, headers and the (possibly truncated) body of a streamed fetch."""
+
+    def __init__(self, url: str, status_code: int, headers, body: bytes, truncated: bool):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.truncated = truncated
+
+
+def fetch_html(
+    url: str,
+    timeout: float,
+    headers: Optional[dict] = None,
+    max_bytes: int = HTML_MAX_BYTES,
+    stop_at_head: bool = False,
+) -> FetchedPage:
+    """
+    Stream an HTML page in chunks instead of buffering the whole response.
+
+    Reading stops after `max_bytes` of (decoded) body, or as soon as `</head>`
+    has been seen when `stop_at_head` is set (enough for og:/twitter: tags).
+    Responses whose Content-Type isn't in HTML_CONTENT_TYPES raise
+    UnsupportedContent before any body is read. Non-2xx responses are
+    returned with an empty body. Uses the shared pooled session.
+    """
+    response = get_session().get(url, headers=headers or BROWSER_HEADERS, timeout=timeout, stream=True)
+    try:
+        if not (200 <= response.status_code < 300):
+            return FetchedPage(response.url, response.status_code, response.headers, b"", False)
+
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type and content_type not in HTML_CONTENT_TYPES:
+            raise UnsupportedContent(f"Unsupported content type: {content_type}")
+
+        chunks = []
+        size = 0
+        truncated = False
+        tail = b""
+        for chunk in response.iter_content(chunk_size=HTML_CHUNK_SIZE):
+            if not chunk:
+                continue
+            if size + len(chunk) > max_bytes:
+                chunks.append(chunk[:max_bytes - size])
+                truncated = True
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+            if stop_at_head:
+                # Search across the chunk boundary so a split tag isn't missed
+                window = (tail + chunk).lower()
+                if b"</head>" in window:
+                    truncated = True
+                    break
+                tail = window[-6:]
+        return FetchedPage(response.url, response.status_code, response.headers, b"".join(chunks), truncated)
+    finally:
+        response.close()
+
+
+def truncate_words(text: str, max_words: int) -> str:
+    words = text.split()
+    if len(words) > max_words:
+        return ' '.join(words[:max_words]) + "..."
+    return text
+
+
+def extract_text(html: bytes, max_words: int = 200) -> str:
+    """
+    Extract readable text from an HTML document, truncated to `max_words`.
+    """
+    from bs4 import BeautifulSoup  # deferred to first scrape to keep startup fast
+
+    soup = BeautifulSoup(html, 'lxml')
+
+    # Remove script and style elements
+    for script in soup(["script", "style", "nav", "footer", "header", "aside"]):
+        script.decompose()
+
+    # Get text
+    text = soup.get_text()
+
+    # Clean up whitespace
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = ' '.join(chunk for chunk in chunks if chunk)
+
+    return truncate_words(text, max_words)
+
+
+def refresh_excerpt(url: str, cached: Optional[dict] = None, timeout: float = EXCERPT_FETCH_TIMEOUT) -> Optional[dict]:
+    """
+    Download `url` and return a new excerpt cache entry, or None on failure.
+    When a `cached` entry carries validators the request is conditional, and a
+    304 just re-stamps the cached entry instead of re-parsing the page.
+    """
+    headers = dict(BROWSER_HEADERS)
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    try:
+        # Short timeout to not stall the request too long
+        response = fetch_html(url, timeout=timeout, headers=headers)
+        if response.status_code == 304 and cached:
+            return dict(cached, fetched_at=time.time())
+        if response.status_code != 200:
+            return None
+        excerpt = extract_text(response.body, EXCERPT_CACHE_MAX_WORDS)
+        if not excerpt:
+            return None
+        return excerpt_cache.make_entry(
+            url,
+            excerpt,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+    except Exception:
+        return None
+
+
+def fetch_article_excerpt(url: str, max_words: int = 200) -> str:
+    """
+    Fetches the URL and extracts text from the first few paragraphs.
+    Served from the excerpt cache while fresh.
+    """
+    return fetch_article_excerpts([url], max_words)[0]
+
+
+def _fetch_in_slot(slot: threading.BoundedSemaphore, url: str, cached: Optional[dict], deadline: float) -> Optional[dict]:
+    """Worker body: fetch within what's left of the batch deadline, then free the domain slot taken for it."""
+    try:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        return refresh_excerpt(url, cached, timeout=min(EXCERPT_FETCH_TIMEOUT, remaining))
+    finally:
+        slot.release()
+
+
+def fetch_article_excerpts(
+    urls: List[Optional[str]],
+    max_words: int = 200,
+    deadline: float = EXCERPT_FETCH_DEADLINE,
+    on_fetched: Optional[Callable[[str, str], None]] = None,
+) -> List[str]:
+    """
+    Fetch excerpts for many URLs concurrently.
+
+    Fresh cache hits are served without touching the network. The remaining
+    URLs are fetched once each, with each publisher domain limited to
+    EXCERPT_FETCH_PER_DOMAIN parallel requests and the whole batch sharing a
+    single `deadline` (seconds). URLs that normalize to the same cache key
+    (tracking parameters, trailing slash, ...) are fetched once. Results are
+    returned in input order; URLs that fail or don't finish in time fall back
+    to a stale cached copy, else "". `on_fetched(url, excerpt)` is called for
+    each distinct URL as its page settles.
+    """
+    batch_deadline = time.monotonic() + deadline
+    cached = excerpt_cache.get_entries(urls)
+    urls_by_key: Dict[str, List[str]] = {}
+    for url in urls:
+        if url:
+            same_page = urls_by_key.setdefault(excerpt_cache.normalize_url(url), [])
+            if url not in same_page:
+                same_page.append(url)
+    entries = {}
+
+    def settled(key):
+        if on_fetched:
+            excerpt = truncate_words(entries[key]["excerpt"], max_words) if key in entries else ""
+            for url in urls_by_key[key]:
+                on_fetched(url, excerpt)
+
+    pending: Dict[str, deque] = {}  # domain -> keys waiting for a free slot
+    for key, same_page in urls_by_key.items():
+        entry = cached.get(key)
+        if excerpt_cache.is_fresh(entry):
+            entries[key] = entry
+            settled(key)
+        else:
+            pending.setdefault(_domain_key(same_page[0]), deque()).append(key)
+
+    key_by_future = {}
+    slot_by_future = {}
+    refreshed = []
+
+    def dispatch():
+        # Only hand a URL to the pool once its domain has a free slot, so no
+        # worker thread ever sits blocked behind a busy publisher
+        for domain, keys in list(pending.items()):
+            slot = _domain_semaphore(domain)
+            while keys and slot.acquire(blocking=False):
+                key = keys.popleft()
+                try:
+                    future = _executor.submit(_fetch_in_slot, slot, urls_by_key[key][0], cached.get(key), batch_deadline)
+                except BaseException:
+                    slot.release()
+                    raise
+                key_by_future[future] = key
+                slot_by_future[future] = slot
+            if not keys:
+                del pending[domain]
+
+    def settle(key, entry):
+        if entry:
+            entries[key] = entry
+            refreshed.append(entry)
+        elif cached.get(key):
+            entries[key] = cached[key]
+        settled(key)
+
+    def result(future):
+        if future.done() and not future.cancelled() and future.exception() is None:
+            return future.result()
+        return None
+
+    dispatch()
+    while key_by_future or pending:
+        remaining = batch_deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # Slots freed by other batches don't wake us, so poll while URLs are waiting
+        timeout = min(remaining, DOMAIN_SLOT_POLL_INTERVAL) if pending else remaining
+        if key_by_future:
+            done, _ = wait(list(key_by_future), timeout=timeout, return_when=FIRST_COMPLETED)
+        else:
+            time.sleep(timeout)
+            done = ()
+        for future in done:
+            slot_by_future.pop(future)
+            settle(key_by_future.pop(future), result(future))
+        dispatch()
+
+    # Out of time: whatever is still running or waiting falls back to the stale copy
+    for future, key in list(key_by_future.items()):
+        if future.cancel():
+            # Never started, so its worker won't release the slot
+            slot_by_future[future].release()
+        settle(key, result(future))
+    for keys in pending.values():
+        for key in keys:
+            settle(key, None)
+    if refreshed:
+        excerpt_cache.store_entries(refreshed)
+
+    keys = [excerpt_cache.normalize_url(url) if url else None for url in urls]
+    return [truncate_words(entries[key]["excerpt"], max_words) if key in entries else "" for key in keys]
@@ -6,28 +6,51 @@ from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 
-from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
-from database import get_db_connection
+from cache import LRUCache
+from config import (
+    SECRET_KEY,
+    ALGORITHM,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    USER_CACHE_TTL,
+    USER_CACHE_SIZE,
+    AUTH_EMBED_USER_CLAIMS,
+)
+import database as db
+import queries
 from models import User, TokenData
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing context, built on first use: only login/register need
+# passlib and bcrypt, so they stay out of the startup path
+_pwd_context = None
+
+
+def _get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# Short-lived cache of resolved users so hot endpoints skip the users lookup
+_user_cache = LRUCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+_USER_BY_ID = queries.register("user_by_id", "SELECT id, email, name, created_at FROM users WHERE id = %s")
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return _get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password using bcrypt."""
-    return pwd_context.hash(password)
+    return _get_pwd_context().hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -56,9 +79,37 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+def create_user_token(user: User) -> str:
+    """
+    Create an access token for `user`. With AUTH_EMBED_USER_CLAIMS enabled the
+    profile is signed into the token, so get_current_user needs no DB lookup.
+    """
+    data = {"sub": user.id}
+    if AUTH_EMBED_USER_CLAIMS:
+        data["usr"] = {
+            "email": user.email,
+            "name": user.name,
+            "created_at": user.created_at.isoformat(),
+        }
+    return create_access_token(data=data)
+
+
+def cache_user(user: User) -> None:
+    """Prime the user cache, e.g. with a row just read at login."""
+    if USER_CACHE_TTL > 0:
+        _user_cache.set(user.id, user)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop a cached user; call after any change to the users row."""
+    _user_cache.delete(user_id)
+
+
+def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     """
     Dependency to get the current authenticated user from JWT token.
+    Users are served from signed token claims (if enabled) or a short-TTL
+    in-process cache before falling back to the database.
     
     Args:
         token: JWT token from Authorization header
@@ -84,28 +135,30 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
         # Convert string back to int
         user_id = int(user_id_str)
         token_data = TokenData(user_id=user_id)
+        claims = payload.get("usr") if AUTH_EMBED_USER_CLAIMS else None
+        if isinstance(claims, dict):
+            return User(id=user_id, **claims)
     except (JWTError, ValueError, TypeError) as e:
         print(f"Token validation error: {e}")
         raise credentials_exception
+
+    cached = _user_cache.get(token_data.user_id)
+    if cached is not None:
+        return cached
     
     # Fetch user from database
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "SELECT id, email, name, created_at FROM users WHERE id = %s",
-            (token_data.user_id,)
-        )
+    with db.read() as cursor:
+        queries.run(cursor, _USER_BY_ID, (token_data.user_id,))
         user_row = cursor.fetchone()
         
         if user_row is None:
             raise credentials_exception
         
-        return User(
+        user = User(
             id=user_row[0],
             email=user_row[1],
             name=user_row[2],
             created_at=user_row[3]
         )
-    finally:
-        conn.close()
+        cache_user(user)
+        return user
@@ -0,0 +1,5 @@
+import pathlib
+import sys
+
+# The backend modules are top-level imports (`import database`), as when run from backend/
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
@@ -0,0 +1,38 @@
+"""
+However many articles were audited in earlier runs, the articles still to be
+audited must keep room for a real excerpt in the prompt.
+"""
+import json
+
+from config import LLM_EXCERPT_MIN_TOKENS, LLM_PROMPT_TOKENS
+from evidence_packer import estimate_tokens, fit_context, pack_evidence
+
+
+def audit(i: int) -> dict:
+    return {"id": f"a{i}", "detected_topic": "Municipal budget overruns in 2023", "verdict": "Relevant", "support_score": 20 + i % 70}
+
+
+def pending_item(i: int) -> dict:
+    return {"id": f"a{i}", "title": "New article", "url": f"https://example.com/{i}", "publisher": "example.com",
+            "excerpt": "word " * 2000}
+
+
+def test_small_context_is_sent_whole():
+    context = [audit(i) for i in range(3)]
+    assert fit_context(context, [pending_item(3)], fixed_tokens=500) == context
+
+
+def test_large_context_leaves_room_for_pending_excerpts():
+    context = [audit(i) for i in range(200)]
+    pending = [pending_item(200)]
+    fixed = 500
+    capped = fit_context(context, pending, fixed)
+
+    summary = capped[-1]
+    assert summary["id"] == "others"
+    assert summary["audited_articles"] + len(capped) - 1 == len(context)
+
+    context_tokens = estimate_tokens(json.dumps(capped, ensure_ascii=False))
+    assert fixed + context_tokens < LLM_PROMPT_TOKENS
+    chunks = pack_evidence(pending, fixed + context_tokens)
+    assert estimate_tokens(chunks[0][0]["excerpt"]) >= LLM_EXCERPT_MIN_TOKENS
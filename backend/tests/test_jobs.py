@@ -0,0 +1,77 @@
+"""
+Per-agenda de-duplication in the job queue shared by /analyze,
+/analyze/stream and /analyze/jobs.
+"""
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from jobs import DONE, FAILED, JobQueue
+
+
+@pytest.fixture
+def gate():
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def blocked(gate, value, on_event=None):
+    if on_event:
+        on_event("phase", {"phase": "fetching"})
+    gate.wait(5)
+    return value
+
+
+def test_same_key_joins_the_running_job(gate):
+    queue = JobQueue()
+    first, created = queue.submit("k", blocked, gate, 1)
+    second, joined_created = queue.submit("k", blocked, gate, 2)
+    gate.set()
+    assert created and not joined_created
+    assert second is first
+    assert first.future.result(5) == 1
+
+
+def test_forced_refresh_does_not_join_a_plain_run(gate):
+    queue = JobQueue()
+    plain, _ = queue.submit("plain", blocked, gate, "cached")
+    forced, created = queue.submit("forced", blocked, gate, "fresh")
+    joined, _ = queue.submit("plain", blocked, gate, "cached", also=("forced",))
+    gate.set()
+    assert created and forced is not plain
+    assert joined is plain
+
+
+def test_plain_request_joins_a_forced_run(gate):
+    queue = JobQueue()
+    forced, _ = queue.submit("forced", blocked, gate, "fresh")
+    plain, created = queue.submit("plain", blocked, gate, "cached", also=("forced",))
+    gate.set()
+    assert not created and plain is forced
+
+
+def test_late_subscriber_gets_replayed_events_then_result(gate):
+    queue = JobQueue()
+    job, _ = queue.submit("k", blocked, gate, {"score": "High"}, progress=True)
+    gate.set()
+    job.future.result(5)
+
+    seen = []
+    job.subscribe(lambda event, data: seen.append((event, data)))
+    assert job.status == DONE
+    assert seen == [("phase", {"phase": "fetching"}), ("result", {"score": "High"})]
+
+
+def test_http_errors_keep_their_status():
+    def missing():
+        raise HTTPException(status_code=404, detail="Agenda not found")
+
+    job, _ = JobQueue().submit("k", missing)
+    job.future.result(5)
+    seen = []
+    job.subscribe(lambda event, data: seen.append((event, data)))
+    assert job.status == FAILED
+    assert job.error_status == 404
+    assert seen == [("error", {"status_code": 404, "detail": "Agenda not found"})]
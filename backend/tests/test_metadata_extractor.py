@@ -0,0 +1,19 @@
+"""
+parse_metadata must cope with whatever charset a server declares in its
+Content-Type, including names libxml2 doesn't recognise.
+"""
+import pytest
+
+from metadata_extractor import parse_metadata
+
+PAGE = (
+    '<html><head><meta charset="utf-8"><title>Café</title>'
+    '<meta property="og:description" content="Naïve"></head></html>'
+).encode("utf-8")
+
+
+@pytest.mark.parametrize("encoding", [None, "utf-8", "latin-1", "utf8mb4", "no-such-charset"])
+def test_unknown_header_charset_falls_back_to_sniffing(encoding):
+    metadata = parse_metadata(PAGE, encoding)
+    assert metadata["description"] == "Naïve"
+    assert metadata["title"] == "Café"
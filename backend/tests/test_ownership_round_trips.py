@@ -0,0 +1,129 @@
+"""
+Ownership-checked mutations must be a single conditional statement each:
+no separate ownership SELECT before the UPDATE/DELETE/INSERT, and a 404
+(not a write) when the caller doesn't own the agenda or article.
+
+Runs against an in-memory stand-in for the psycopg2 connection that counts
+every statement the routes send, so no database is needed.
+"""
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+
+import database as db
+from main import app
+from models import User
+from security import get_current_user
+
+OWNER_ID = 1
+OTHER_ID = 2
+AGENDA_ID = 10
+ARTICLE_ID = 20
+NOW = datetime(2024, 1, 1)
+
+
+class _Info:
+    transaction_status = TRANSACTION_STATUS_IDLE
+
+
+class CountingCursor:
+    """Answers like the agendas/articles tables holding one agenda and one article owned by OWNER_ID."""
+
+    def __init__(self, conn):
+        self.connection = conn
+        self.rowcount = 0
+        self._row = None
+
+    def execute(self, sql, params=()):
+        self.connection.statements.append(sql)
+        if not self.connection.autocommit:
+            self.connection.info.transaction_status = TRANSACTION_STATUS_INTRANS
+        # Every statement under test targets AGENDA_ID or ARTICLE_ID and ends with the caller's user id
+        owned = params[-1] == OWNER_ID and (AGENDA_ID in params or ARTICLE_ID in params)
+        self.rowcount = 1 if owned else 0
+        if not owned:
+            self._row = None
+        elif "INSERT INTO articles" in sql:
+            self._row = (ARTICLE_ID + 1, AGENDA_ID, "Article", "https://example.com", "Summary", None, NOW)
+        else:
+            self._row = (AGENDA_ID, OWNER_ID, "Agenda", NOW, "token")
+
+    def fetchone(self):
+        return self._row
+
+
+class CountingConnection:
+    closed = False
+
+    def __init__(self):
+        self.autocommit = False
+        self.info = _Info()
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return CountingCursor(self)
+
+    def commit(self):
+        self.commits += 1
+        self.info.transaction_status = TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    connection = CountingConnection()
+    db.close_db_pool()
+    monkeypatch.setattr(db, "_connect", lambda: connection)
+    yield connection
+    db.close_db_pool()
+
+
+def client_for(user_id: int) -> TestClient:
+    app.dependency_overrides[get_current_user] = lambda: User(
+        id=user_id, email=f"user{user_id}@example.com", name="User", created_at=NOW
+    )
+    return TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def clear_overrides():
+    yield
+    app.dependency_overrides.clear()
+
+
+MUTATIONS = [
+    ("patch", f"/agendas/{AGENDA_ID}", {"title": "Renamed"}, 200),
+    ("delete", f"/agendas/{AGENDA_ID}", None, 204),
+    ("post", f"/agendas/{AGENDA_ID}/share", None, 200),
+    ("post", f"/agendas/{AGENDA_ID}/unshare", None, 200),
+    ("post", f"/agendas/{AGENDA_ID}/articles", {"title": "Article", "url": "https://example.com", "description": "Summary"}, 201),
+    ("delete", f"/articles/{ARTICLE_ID}", None, 204),
+]
+
+
+@pytest.mark.parametrize("method,path,body,ok_status", MUTATIONS)
+def test_owner_mutation_is_one_statement(conn, method, path, body, ok_status):
+    response = client_for(OWNER_ID).request(method, path, json=body)
+    assert response.status_code == ok_status, response.text
+    assert len(conn.statements) == 1, conn.statements
+    assert conn.commits == 1
+    assert conn.rollbacks == 0
+
+
+@pytest.mark.parametrize("method,path,body,ok_status", MUTATIONS)
+def test_non_owner_gets_404_from_one_statement(conn, method, path, body, ok_status):
+    response = client_for(OTHER_ID).request(method, path, json=body)
+    assert response.status_code == 404, response.text
+    assert len(conn.statements) == 1, conn.statements
+    # The 404 is raised inside db.transaction(), which rolls back instead of committing
+    assert conn.commits == 0
@@ -0,0 +1,97 @@
+"""
+Persistent cache for per-URL lookups (page metadata, iframe embedding policy).
+
+Results are keyed by (kind, normalized URL), held in an in-memory LRU and
+persisted to the `url_metadata_cache` table so they survive restarts.
+Failed lookups are cached too, for a shorter time, so a dead URL doesn't
+cost a full timeout on every card render. Concurrent lookups of the same
+URL share a single outbound request.
+"""
+import time
+from typing import Callable, Optional, Tuple
+
+from psycopg2.extras import Json
+
+from cache import LRUCache, SingleFlight, normalize_url
+from config import URL_CACHE_TTL, URL_CACHE_NEGATIVE_TTL, URL_CACHE_MEMORY_SIZE
+import database as db
+
+
+class URLCache:
+    def __init__(self, kind: str, ttl: float = URL_CACHE_TTL, negative_ttl: float = URL_CACHE_NEGATIVE_TTL):
+        self.kind = kind
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._memory = LRUCache(maxsize=URL_CACHE_MEMORY_SIZE)
+        self._flights = SingleFlight()
+
+    def get_or_fetch(self, url: str, fetch: Callable[[], Tuple[dict, bool]]) -> dict:
+        """
+        Return the cached payload for `url`, or call `fetch()` once to produce it.
+        `fetch` returns (payload, ok); ok=False payloads are negative entries
+        and expire after `negative_ttl` instead of `ttl`.
+        """
+        key = normalize_url(url)
+        payload = self._lookup(key)
+        if payload is not None:
+            return payload
+        return self._flights.do(key, self._fetch_and_store, key, fetch)
+
+    def invalidate(self, url: str) -> None:
+        self._memory.delete(normalize_url(url))
+
+    def _lookup(self, key: str) -> Optional[dict]:
+        payload = self._memory.get(key)
+        if payload is not None:
+            return payload
+        row = self._load(key)
+        if row is None:
+            return None
+        payload, expires_at = row
+        self._memory.set(key, payload, ttl=expires_at - time.time())
+        return payload
+
+    def _fetch_and_store(self, key: str, fetch: Callable[[], Tuple[dict, bool]]) -> dict:
+        # Another flight may have stored it between our lookup and taking the lead
+        payload = self._memory.get(key)
+        if payload is not None:
+            return payload
+        payload, ok = fetch()
+        ttl = self.ttl if ok else self.negative_ttl
+        self._memory.set(key, payload, ttl=ttl)
+        self._save(key, payload, ok, time.time() + ttl)
+        return payload
+
+    def _load(self, key: str) -> Optional[Tuple[dict, float]]:
+        try:
+            with db.read() as cursor:
+                cursor.execute(
+                    """SELECT payload, EXTRACT(EPOCH FROM expires_at)
+                       FROM url_metadata_cache
+                       WHERE kind = %s AND url_key = %s AND expires_at > CURRENT_TIMESTAMP""",
+                    (self.kind, key)
+                )
+                row = cursor.fetchone()
+                return (row[0], float(row[1])) if row else None
+        except Exception as e:
+            print(f"URL cache read failed: {e}")
+            return None
+
+    def _save(self, key: str, payload: dict, ok: bool, expires_at: float) -> None:
+        try:
+            with db.transaction() as cursor:
+                cursor.execute(
+                    """INSERT INTO url_metadata_cache (kind, url_key, ok, payload, expires_at)
+                       VALUES (%s, %s, %s, %s, to_timestamp(%s))
+                       ON CONFLICT (kind, url_key) DO UPDATE SET
+                           ok = EXCLUDED.ok,
+                           payload = EXCLUDED.payload,
+                           expires_at = EXCLUDED.expires_at""",
+                    (self.kind, key, ok, Json(payload), expires_at)
+                )
+        except Exception as e:
+            print(f"URL cache write failed: {e}")
+
+
+metadata_cache = URLCache("metadata")
+iframe_cache = URLCache("iframe")